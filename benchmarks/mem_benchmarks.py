@@ -0,0 +1,314 @@
+"""
+Benchmarks of the memory consumer hot paths.
+
+Measures allocation and release in MemConsumer.change_allocation, the time RSS needs
+to drop after release, MemPattern lookups and loading, and the cost of the RSS probe.
+Results are written as json and can be compared against the stored baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.mem_benchmarks --output bench.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter, sleep
+import psutil
+from memory_consumer.mem_backends import (
+    MallocChurnBackend,
+    MallocChurnParams,
+    MemBackend,
+    ObjectGraphBackend,
+    ObjectGraphParams,
+    ShmBackend,
+)
+from memory_consumer.mem_consumer import MemConsumer, MemConsumerParams, MEGA
+from memory_consumer.mem_pattern import MemPattern
+
+PATTERNS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "patterns")
+# one pattern of every type shipped with the package
+PATTERN_FILES = {
+    "s": os.path.join(PATTERNS_DIR, "s", "high_low.csv"),
+    "m": os.path.join(PATTERNS_DIR, "m", "high_low.csv"),
+    "ms": os.path.join(PATTERNS_DIR, "ms", "biz.csv"),
+    "dhm": os.path.join(PATTERNS_DIR, "dhm", "A_B.csv"),
+}
+# chunk sizes (MB) used in allocation benchmarks
+CHUNK_SIZES_MEGA = (1, 5, 10)
+# factories of allocation backends of MemConsumer
+BACKENDS = {
+    "bytearray": MemBackend,
+    "malloc": lambda: MallocChurnBackend(MallocChurnParams(trim=True, seed=0)),
+    "objects": lambda: ObjectGraphBackend(
+        ObjectGraphParams(object_kind="dict", count_tracked=False)
+    ),
+    "shm": ShmBackend,
+}
+# number of chunks allocated/released in a single allocation benchmark
+CHUNKS_PER_RUN = 40
+# default relative change of a result treated as a regression
+REGRESSION_THRESHOLD = 0.3
+
+
+def _result(value: float, unit: str, higher_is_better: bool, timed_out: bool = False) -> dict:
+    result = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+    # the value of a timed out measurement is the timeout, not a measured value
+    if timed_out:
+        result["timed_out"] = True
+    return result
+
+
+def _make_consumer(chunk_size_mega: int, backend_factory) -> MemConsumer:
+    mem_pattern = MemPattern(PATTERN_FILES["s"])
+    mc_params = MemConsumerParams(max_ram_mega=chunk_size_mega * 100)
+    return MemConsumer(mem_pattern, mc_params, backend=backend_factory())
+
+
+def bench_allocation(repeats: int = 5) -> dict:
+    """Measures per-chunk latency and throughput of allocation and release.
+
+    Chunks are added and removed one by one through MemConsumer._resize_memory_array,
+    the part of change_allocation without the settle sleep.
+    """
+    results = {}
+    for backend, backend_factory in BACKENDS.items():
+        for chunk_size in CHUNK_SIZES_MEGA:
+            consumer = _make_consumer(chunk_size, backend_factory)
+            # the memory array is empty, so it reports the initial allocation only
+            base = consumer.mem_array_allocated_memory_mega() // chunk_size + 1
+            alloc_latencies, release_latencies = [], []
+            for _ in range(repeats):
+                for k in range(1, CHUNKS_PER_RUN + 1):
+                    start = perf_counter()
+                    consumer._resize_memory_array(base + k)  # pylint: disable=protected-access
+                    alloc_latencies.append(perf_counter() - start)
+                for k in range(CHUNKS_PER_RUN - 1, -1, -1):
+                    start = perf_counter()
+                    consumer._resize_memory_array(base + k)  # pylint: disable=protected-access
+                    release_latencies.append(perf_counter() - start)
+            consumer._resize_memory_array(0)  # pylint: disable=protected-access
+            consumer.backend.close()
+            for name, latencies in (("alloc", alloc_latencies), ("release", release_latencies)):
+                prefix = f"{name}.{backend}.{chunk_size}MB"
+                median = statistics.median(latencies)
+                results[f"{prefix}.latency_median"] = _result(median * 1e3, "ms", False)
+                results[f"{prefix}.latency_p95"] = _result(
+                    statistics.quantiles(latencies, n=20)[-1] * 1e3, "ms", False
+                )
+                results[f"{prefix}.throughput"] = _result(
+                    chunk_size / median if median > 0 else 0.0, "MB/s", True
+                )
+    return results
+
+
+def bench_rss_drop(chunk_size_mega: int = 10, timeout: float = 5.0) -> dict:
+    """Measures time RSS needs to drop to the initial level after the release of memory.
+
+    If RSS does not drop within timeout, the result is marked as timed out.
+    """
+    results = {}
+    process = psutil.Process(os.getpid())
+    for backend, backend_factory in BACKENDS.items():
+        consumer = _make_consumer(chunk_size_mega, backend_factory)
+        base = consumer.mem_array_allocated_memory_mega() // chunk_size_mega + 1
+        rss_before = process.memory_info().rss
+        consumer._resize_memory_array(base + CHUNKS_PER_RUN)  # pylint: disable=protected-access
+        start = perf_counter()
+        consumer._resize_memory_array(0)  # pylint: disable=protected-access
+        # RSS is treated as dropped when at least 90% of the released memory is returned
+        tolerance = max(chunk_size_mega, chunk_size_mega * CHUNKS_PER_RUN // 10) * MEGA
+        timed_out = False
+        while process.memory_info().rss > rss_before + tolerance:
+            if perf_counter() - start > timeout:
+                timed_out = True
+                break
+            sleep(0.001)
+        elapsed = perf_counter() - start
+        consumer.backend.close()
+        results[f"rss_drop.{backend}.{chunk_size_mega * CHUNKS_PER_RUN}MB"] = _result(
+            elapsed * 1e3, "ms", False, timed_out
+        )
+    return results
+
+
+def bench_get_value(lookups: int = 20000) -> dict:
+    """Measures MemPattern.get_value lookups per second for every pattern type."""
+    results = {}
+    for pattern_type, file_name in PATTERN_FILES.items():
+        for noise_percent in (0, 10):
+            mem_pattern = MemPattern(file_name, noise_percent)
+            date_times = [
+                datetime(2023, 10, 2) + timedelta(seconds=17 * i) for i in range(lookups)
+            ]
+            start = perf_counter()
+            for date_time in date_times:
+                mem_pattern.get_value(date_time)
+            elapsed = perf_counter() - start
+            results[f"get_value.{pattern_type}.noise{noise_percent}"] = _result(
+                lookups / elapsed, "lookups/s", True
+            )
+    return results
+
+
+def _write_pattern(file_name: str, header: list, keys) -> int:
+    rows = 0
+    with open(file_name, mode="w", encoding="utf-8") as out:
+        out.write(",".join(header) + "\n")
+        for key in keys:
+            out.write(",".join(str(v) for v in key) + f",{rows % 100}\n")
+            rows += 1
+    return rows
+
+
+def bench_pattern_load(repeats: int = 11) -> dict:
+    """Measures MemPattern loading time for patterns of growing size."""
+    generated = {
+        "s_1s": (["s", "mem"], [(s,) for s in range(60)]),
+        "ms_1s": (["m", "s", "mem"], [(m, s) for m in range(60) for s in range(60)]),
+        "dhm_1m": (
+            ["d", "h", "m", "mem"],
+            [(d, h, m) for d in range(7) for h in range(24) for m in range(60)],
+        ),
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, (header, keys) in generated.items():
+            file_name = os.path.join(tmp_dir, f"{name}.csv")
+            rows = _write_pattern(file_name, header, keys)
+            times = []
+            for _ in range(repeats):
+                start = perf_counter()
+                MemPattern(file_name)
+                times.append(perf_counter() - start)
+            results[f"pattern_load.{name}.{rows}rows"] = _result(
+                statistics.median(times) * 1e3, "ms", False
+            )
+    return results
+
+
+def bench_rss_probe(probes: int = 2000) -> dict:
+    """Measures the cost of reading memory allocated for the process."""
+    consumer = _make_consumer(10, MemBackend)
+    start = perf_counter()
+    for _ in range(probes):
+        consumer.os_allocated_memory_mega()
+    elapsed = perf_counter() - start
+    return {"rss_probe": _result(elapsed / probes * 1e6, "us", False)}
+
+
+BENCHMARKS = {
+    "allocation": bench_allocation,
+    "rss_drop": bench_rss_drop,
+    "get_value": bench_get_value,
+    "pattern_load": bench_pattern_load,
+    "rss_probe": bench_rss_probe,
+}
+
+
+def run_benchmarks(names=None) -> dict:
+    """Runs selected (all by default) benchmarks and returns their results with metadata."""
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results.update(benchmark())
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(
+    results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD
+) -> list:
+    """Compares results with the baseline.
+
+    Parameters
+    ----------
+    results : dict
+        Results returned by run_benchmarks.
+    baseline : dict
+        Results stored as the baseline.
+    threshold : float
+        Relative change of a result treated as a regression.
+
+    Returns
+    -------
+    list
+        Tuples (name, baseline value, value, relative change, regression flag)
+        for results present in both.
+        Relative change is positive when the result got better.
+        A timed out result is always a regression, also if the baseline timed out.
+    """
+    comparison = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or base["value"] == 0:
+            continue
+        change = (result["value"] - base["value"]) / base["value"]
+        if not result["higher_is_better"]:
+            change = -change
+        regression = change < -threshold or result.get("timed_out", False)
+        comparison.append((name, base["value"], result["value"], change, regression))
+    return comparison
+
+
+def main():
+    """starts Memory consumer benchmarks"""
+    parser = argparse.ArgumentParser(description="Memory consumer benchmarks")
+    parser.add_argument(
+        "-b",
+        "--benchmarks",
+        type=str,
+        nargs="*",
+        choices=list(BENCHMARKS),
+        help="Benchmarks to run. Default - all.",
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, default=None, help="Json file the results are written to."
+    )
+    parser.add_argument(
+        "--baseline", type=str, default=None, help="Json file with the baseline results."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Relative change treated as a regression (default: %(default)s).",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.benchmarks)
+    for name, result in results["results"].items():
+        timed_out = " (timed out)" if result.get("timed_out") else ""
+        print(f"{name:45s} {result['value']:14.3f} {result['unit']}{timed_out}")
+    if args.output is not None:
+        with open(args.output, mode="w", encoding="utf-8") as out:
+            json.dump(results, out, indent=2)
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, mode="r", encoding="utf-8") as base_file:
+        baseline = json.load(base_file)
+    regressions = 0
+    print(f"\nComparison with baseline {args.baseline} ({baseline['meta']['date']}):")
+    for name, base_value, value, change, regression in compare_with_baseline(
+        results, baseline, args.threshold
+    ):
+        regressions += int(regression)
+        flag = "REGRESSION" if regression else ""
+        print(f"{name:45s} {base_value:14.3f} -> {value:14.3f} {change:+8.1%} {flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Computes statistics of memory consumer run logs.
+"""
+import argparse
+import csv
+import os
+from memory_consumer.log_analytics import (
+    DownsampledCsvWriter,
+    analyze_log,
+    csv_file_names,
+    format_summary_table,
+)
+
+
+def main():
+    """starts Memory consumer log analytics app"""
+    parser = argparse.ArgumentParser(description="Memory consumer log analytics")
+    parser.add_argument(
+        "logs",
+        type=str,
+        nargs="+",
+        help="Memory consumer run logs (text, jsonl or binary, optionally .gz compressed).",
+    )
+    parser.add_argument(
+        "-p",
+        "--tolerance_percent",
+        type=float,
+        default=2.0,
+        help="RSS matches the target if the error is not greater than this percent "
+        "of the maximum memory (default: %(default)s).",
+    )
+    parser.add_argument(
+        "-c",
+        "--csv_dir",
+        type=str,
+        default=None,
+        help="Directory the downsampled csv files (one per log) are written to, "
+        "named by the log path relative to the common directory of the logs "
+        "(e.g. w1_run.jsonl.csv). Default - no csv files.",
+    )
+    parser.add_argument(
+        "-w",
+        "--window_sec",
+        type=float,
+        default=60.0,
+        help="Averaging window of the downsampled csv files in seconds "
+        "(default: %(default)s).",
+    )
+    parser.add_argument(
+        "-o",
+        "--summary_csv",
+        type=str,
+        default=None,
+        help="Csv file the summary table is written to.",
+    )
+    args = parser.parse_args()
+
+    try:
+        csv_names = csv_file_names(args.logs)
+    except ValueError as err:
+        parser.error(str(err))
+    summaries = {}
+    for log, csv_name in zip(args.logs, csv_names):
+        csv_writer = None
+        if args.csv_dir is not None:
+            os.makedirs(args.csv_dir, exist_ok=True)
+            csv_writer = DownsampledCsvWriter(
+                os.path.join(args.csv_dir, csv_name), args.window_sec
+            )
+        try:
+            summaries[log] = analyze_log(log, args.tolerance_percent, csv_writer)
+        finally:
+            if csv_writer is not None:
+                csv_writer.close()
+
+    print(format_summary_table(summaries))
+    if args.summary_csv is not None and summaries:
+        with open(args.summary_csv, mode="w", encoding="utf-8", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(["log", *next(iter(summaries.values())).keys()])
+            for log, summary in summaries.items():
+                writer.writerow([log, *summary.values()])
+
+
+if __name__ == "__main__":
+    main()
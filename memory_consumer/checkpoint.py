@@ -0,0 +1,154 @@
+"""
+Implements checkpoints of the MemConsumer run state, so the run can be resumed after restart.
+"""
+import json
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from time import time
+
+# version of the checkpoint file format
+CHECKPOINT_VERSION = 1
+
+
+def rng_state_to_json(state: tuple) -> list:
+    """Converts the state of the random module (random.getstate) to a JSON list."""
+    version, internal_state, gauss_next = state
+    return [version, list(internal_state), gauss_next]
+
+
+def rng_state_from_json(state: list) -> tuple:
+    """Converts the JSON list (see rng_state_to_json) back to the random module state."""
+    version, internal_state, gauss_next = state
+    return version, tuple(internal_state), gauss_next
+
+
+# all values needed to resume the run are kept flat, so they map to a single JSON object
+@dataclass(init=True, repr=True)
+class RunCheckpoint:  # pylint: disable=too-many-instance-attributes
+    """Stores the state of the MemConsumer run needed to resume it.
+
+    Arguments:
+
+    step : `int`
+        number of the last finished allocation step
+    trend_multiplier : `float`
+        linear trend multiplier of the step (see MemConsumer.get_trend_multiplier)
+    target_percent : `int`
+        allocation required in the step in percent of max_ram_mega
+    target_mega : `int`
+        allocation required in the step in MB
+    achieved_mega : `int`
+        memory allocated after the step in MB (lower than target_mega
+        when the allocation rate is limited), pre-faulted on resume
+    run_start : `float`
+        wall time (epoch seconds) of the start of the run, the pattern time
+        is computed from
+    time_shift_sec : `float`
+        shift of the pattern time in seconds (see start_from_beginning)
+    pattern_file : `str`
+        memory consumption pattern file used in the step
+    max_ram_mega : `int`
+        maximal amount of memory to be allocated in the step
+    rng_state : `list`, default=[]
+        state of the random module generating the noise (see rng_state_to_json)
+    saved_at : `float`, default=0.0
+        wall time (epoch seconds) the checkpoint was written at
+    """
+
+    step: int
+    trend_multiplier: float
+    target_percent: int
+    target_mega: int
+    achieved_mega: int
+    run_start: float
+    time_shift_sec: float
+    pattern_file: str
+    max_ram_mega: int
+    rng_state: list = field(default_factory=list)
+    saved_at: float = 0.0
+
+
+class CheckpointStore:
+    """Writes and reads the checkpoint file of the MemConsumer run.
+
+    The file is small (a single JSON object) and is replaced atomically,
+    so a process killed while writing (e.g. OOM-killed) leaves the previous checkpoint.
+
+    Parameters
+    ----------
+    file_name : `str`
+        checkpoint file, it should be kept across restarts (e.g. on a volume of the pod)
+    every_steps : `int`, default=1
+        the checkpoint is written every every_steps allocation steps
+    """
+
+    def __init__(self, file_name: str, every_steps: int = 1):
+        if every_steps < 1:
+            raise ValueError("every_steps >= 1 expected")
+        self.file_name = file_name
+        self.every_steps = every_steps
+
+    def __repr__(self):
+        return f"CheckpointStore: {self.file_name}, every {self.every_steps} steps"
+
+    def is_due(self, step: int) -> bool:
+        """Checks if the checkpoint should be written after the allocation step."""
+        return (step + 1) % self.every_steps == 0
+
+    def save(self, checkpoint: RunCheckpoint, rng_state: tuple = None):
+        """Writes the checkpoint with the state of the random module.
+
+        Parameters
+        ----------
+        checkpoint : RunCheckpoint
+            Run state to be written, its rng_state and saved_at are set.
+        rng_state : tuple, default=None
+            State of the random module, if not provided random.getstate() is used.
+        """
+        checkpoint.rng_state = rng_state_to_json(
+            rng_state if rng_state is not None else random.getstate()
+        )
+        checkpoint.saved_at = time()
+        data = {"version": CHECKPOINT_VERSION, **asdict(checkpoint)}
+        tmp_file_name = f"{self.file_name}.tmp"
+        with open(tmp_file_name, mode="w", encoding="utf-8") as checkpoint_file:
+            json.dump(data, checkpoint_file)
+        os.replace(tmp_file_name, self.file_name)
+
+    def load(self) -> RunCheckpoint:
+        """Reads the checkpoint, returns None if there is no checkpoint.
+
+        Raises
+        ------
+        ValueError
+            If the checkpoint file cannot be parsed, has an unknown version
+            or wrong values (e.g. the random generator state).
+        """
+        try:
+            with open(self.file_name, mode="r", encoding="utf-8") as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            raise ValueError(f"cannot read checkpoint {self.file_name}: {err}") from err
+        if not isinstance(data, dict) or data.pop("version", None) != CHECKPOINT_VERSION:
+            raise ValueError(f"unknown version of checkpoint {self.file_name}")
+        try:
+            checkpoint = RunCheckpoint(**data)
+            # values are checked, so the run state can be restored without errors
+            random.Random().setstate(rng_state_from_json(checkpoint.rng_state))
+            for name in ("step", "achieved_mega", "max_ram_mega"):
+                setattr(checkpoint, name, int(getattr(checkpoint, name)))
+            for name in ("run_start", "time_shift_sec", "saved_at"):
+                setattr(checkpoint, name, float(getattr(checkpoint, name)))
+        except (TypeError, ValueError) as err:
+            raise ValueError(f"wrong checkpoint {self.file_name}: {err}") from err
+        return checkpoint
+
+    def remove(self):
+        """Removes the checkpoint, e.g. when the run is finished."""
+        try:
+            os.remove(self.file_name)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,208 @@
+"""
+Implements ColdMemory class marking a part of allocated memory as cold with madvise.
+"""
+import ctypes
+import ctypes.util
+import mmap
+import os
+import resource
+from dataclasses import dataclass
+from time import perf_counter
+from memory_consumer.mem_backends import MEGA, MemBackend
+from memory_consumer.telemetry import read_swap_mega
+
+# madvise advices of idle memory (Linux >= 5.4):
+# cold - pages are deactivated, so they are reclaimed first under memory pressure,
+# pageout - pages are reclaimed (swapped out) immediately
+COLD_ADVICES = {"cold": 20, "pageout": 21}
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def _load_madvise():
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    libc.madvise.restype = ctypes.c_int
+    libc.madvise.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+    return libc.madvise
+
+
+def _page_range(buffer) -> tuple:
+    """Returns address and length of the whole pages inside the buffer."""
+    length = len(buffer)
+    if length == 0:
+        return 0, 0
+    # the ctypes view is released at once, so the buffer stays resizable
+    address = ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+    start = -(-address // PAGE_SIZE) * PAGE_SIZE
+    end = (address + length) // PAGE_SIZE * PAGE_SIZE
+    return start, max(0, end - start)
+
+
+@dataclass(init=True, repr=True)
+class ColdMemoryParams:
+    """Stores parameters for ColdMemory.
+
+    Arguments:
+
+    fraction : `float`, default=0.0
+        fraction of allocated memory chunks (the oldest ones) marked as cold
+    advice : `str`, default="cold"
+        madvise advice used, one of COLD_ADVICES
+    every_steps : `int`, default=1
+        chunks are marked as cold every every_steps allocation steps
+    refault_after_steps : `int`, default=0
+        number of steps after which cold chunks are read again (faulted back in),
+        0 - cold chunks are not read
+    """
+
+    fraction: float = 0.0
+    advice: str = "cold"
+    every_steps: int = 1
+    refault_after_steps: int = 0
+
+
+class ColdMemory:
+    """Marks the oldest allocated chunks as cold and optionally faults them back in.
+
+    Models services with large idle heaps: the cold chunks are reclaimed (swapped out)
+    by the kernel and read again later. Time, swap and page fault statistics of
+    both are returned for every allocation step.
+
+    Parameters
+    ----------
+    params : ColdMemoryParams
+        cold memory parameters
+    backend : MemBackend
+        backend allocating the chunks, its chunks should be buffers (buffer_chunks)
+
+    Raises
+    ------
+    ValueError
+        If the parameters are wrong, the backend chunks are not buffers
+        or the kernel does not support the advice.
+    """
+
+    def __init__(self, params: ColdMemoryParams, backend: MemBackend):
+        if params.advice not in COLD_ADVICES:
+            raise ValueError(f"advice should be one of {list(COLD_ADVICES)}")
+        if not 0.0 <= params.fraction <= 1.0 or params.every_steps < 1:
+            raise ValueError("fraction in [0, 1] and every_steps >= 1 expected")
+        if not backend.buffer_chunks:
+            raise ValueError(f"chunks of the {backend.name} backend cannot be marked as cold")
+        self.params = params
+        self.backend = backend
+        self._madvise = _load_madvise()
+        self._advice = COLD_ADVICES[params.advice]
+        # steps the chunks (by position in the memory array) were marked as cold at
+        self._cold = {}
+        self._check_advice()
+
+    def __repr__(self):
+        return (
+            f"ColdMemory: fraction={self.params.fraction}, advice={self.params.advice}, "
+            f"every {self.params.every_steps} steps, "
+            f"refault after {self.params.refault_after_steps} steps"
+        )
+
+    def _check_advice(self):
+        with mmap.mmap(-1, PAGE_SIZE) as probe:
+            self._advise(probe)
+
+    def _advise(self, buffer) -> int:
+        address, length = _page_range(buffer)
+        if length and self._madvise(address, length, self._advice) != 0:
+            errno = ctypes.get_errno()
+            raise ValueError(
+                f"madvise {self.params.advice} failed: {os.strerror(errno)} "
+                "(Linux >= 5.4 required)"
+            )
+        return length
+
+    @staticmethod
+    def _refault(buffer) -> int:
+        """Reads a byte of every page of the buffer, so swapped out pages are read in."""
+        view = memoryview(buffer)
+        bytes(view[::PAGE_SIZE])
+        view.release()
+        return len(buffer)
+
+    def release(self, keep: int):
+        """Forgets chunks released from the memory array, all but the first keep ones.
+
+        It should be called whenever the memory array is cut, so chunks allocated
+        later at the same positions are not taken as cold.
+        """
+        self._cold = {
+            position: marked for position, marked in self._cold.items() if position < keep
+        }
+
+    def step(self, chunks: list, step: int) -> dict:
+        """Faults back in and marks as cold chunks due in the allocation step.
+
+        Parameters
+        ----------
+        chunks : list
+            Chunks of the memory array, the oldest first. The array is changed
+            only at its end, chunks released from it are reported with release.
+        step : int
+            Allocation step number.
+
+        Returns
+        -------
+        dict
+            Size of cold chunks and statistics of the refault and the advice.
+        """
+        self.release(len(chunks))
+        stats = {}
+        due = [
+            position
+            for position, marked in self._cold.items()
+            if 0 < self.params.refault_after_steps <= step - marked
+        ]
+        if due:
+            stats.update(
+                self._measure(
+                    self._refault, [chunks[k] for k in due], "refault", "swap_in_mega", -1
+                )
+            )
+            for position in due:
+                del self._cold[position]
+        if step % self.params.every_steps == 0:
+            selected = [
+                position
+                for position in range(int(round(self.params.fraction * len(chunks))))
+                if position not in self._cold and position not in due
+            ]
+            if selected:
+                stats.update(
+                    self._measure(
+                        self._advise, [chunks[k] for k in selected], "advise", "swap_out_mega", 1
+                    )
+                )
+                self._cold.update((position, step) for position in selected)
+        stats["cold_mega"] = round(
+            sum(len(self.backend.chunk_buffer(chunks[k])) for k in self._cold) / MEGA, 1
+        )
+        return stats
+
+    def _measure(
+        self, operation, chunks: list, name: str, swap_key: str, swap_sign: int
+    ) -> dict:
+        """Applies the operation to buffers of the chunks measuring time, faults and swap.
+
+        The swap change is reported as swap_key, multiplied by swap_sign
+        (1 - swap out, -1 - swap in) and cut to be not negative.
+        """
+        swap_before = read_swap_mega()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = perf_counter()
+        size = sum(operation(self.backend.chunk_buffer(chunk)) for chunk in chunks)
+        elapsed = perf_counter() - start
+        major_faults = resource.getrusage(resource.RUSAGE_SELF).ru_majflt - usage.ru_majflt
+        swapped = max(0.0, swap_sign * (read_swap_mega() - swap_before))
+        return {
+            f"{name}_mega": round(size / MEGA, 1),
+            f"{name}_ms": round(elapsed * 1e3, 3),
+            f"{name}_major_faults": major_faults,
+            swap_key: round(swapped, 1),
+            f"{swap_key}_sec": round(swapped / elapsed, 1) if elapsed > 0 else 0.0,
+        }
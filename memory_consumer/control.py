@@ -0,0 +1,248 @@
+"""
+Implements runtime control of a running MemConsumer through a local Unix socket.
+
+The protocol is line based: a client sends one JSON object per line and receives
+one JSON object per line in response. Supported requests:
+
+    {"cmd": "status"}
+    {"cmd": "pause"}
+    {"cmd": "resume"}
+    {"cmd": "force", "percent": 50}      (percent null clears the forced target)
+    {"cmd": "set", "max_ram_mega": 2000, "noise_percent": 5, "time_slot_sec": 3,
+     "linear_trend_slope": 0.1}
+    {"cmd": "pattern", "file": "patterns/ms/biz.csv"}
+
+Changes are applied by MemConsumer at the beginning of the next allocation step,
+the memory already allocated is kept.
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from memory_consumer.mem_pattern import MemPattern
+
+# parameters which can be changed with the set request and their types
+SETTABLE_PARAMS = {
+    "max_ram_mega": int,
+    "noise_percent": int,
+    "time_slot_sec": float,
+    "linear_trend_slope": float,
+}
+
+
+def load_complete_pattern(pattern_file_name: str, noise_percent: int = 0) -> MemPattern:
+    """Loads the pattern and checks it covers its whole period.
+
+    Raises
+    ------
+    ValueError
+        If the file cannot be parsed or the pattern is incomplete
+        (e.g. the file is being written).
+    """
+    try:
+        mem_pattern = MemPattern(pattern_file_name, noise_percent)
+    except (OSError, TypeError, ValueError, IndexError, AttributeError) as err:
+        raise ValueError(f"cannot load pattern {pattern_file_name}: {err}") from err
+    if not mem_pattern.is_complete():
+        raise ValueError(f"pattern {pattern_file_name} does not cover its whole period")
+    return mem_pattern
+
+
+class ConsumerControl:
+    """Stores control requests for MemConsumer and the state it publishes.
+
+    Requests are accepted from any thread (e.g. ControlServer), they are taken and
+    applied by MemConsumer at the beginning of an allocation step.
+
+    Parameters
+    ----------
+    watch_pattern : `bool`, default=False
+        flag that if True forces reloading the pattern file when it changes
+    """
+
+    def __init__(self, watch_pattern: bool = False):
+        self.watch_pattern = watch_pattern
+        self.paused = False
+        self.forced_percent = None
+        self._lock = threading.Lock()
+        self._pending_params = {}
+        self._pending_pattern = None
+        self._status = {}
+
+    def handle(self, request: dict) -> dict:
+        """Handles the control request.
+
+        Parameters
+        ----------
+        request : dict
+            Request with the "cmd" key, see the module description.
+
+        Returns
+        -------
+        dict
+            Response with the "ok" key, "error" if the request is rejected
+            and "status" for the status request.
+        """
+        handlers = {
+            "status": self._handle_status,
+            "pause": self._handle_pause,
+            "resume": self._handle_pause,
+            "force": self._handle_force,
+            "set": self._handle_set,
+            "pattern": self._handle_pattern,
+        }
+        handler = handlers.get(request.get("cmd"))
+        if handler is None:
+            return {"ok": False, "error": f"unknown cmd, one of {list(handlers)} expected"}
+        try:
+            return handler(request)
+        except (KeyError, TypeError, ValueError) as err:
+            return {"ok": False, "error": str(err)}
+
+    def _handle_status(self, _request: dict) -> dict:
+        with self._lock:
+            status = dict(self._status)
+        return {"ok": True, "status": status}
+
+    def _handle_pause(self, request: dict) -> dict:
+        self.paused = request["cmd"] == "pause"
+        return {"ok": True}
+
+    def _handle_force(self, request: dict) -> dict:
+        percent = request.get("percent")
+        if percent is not None and int(percent) < 0:
+            raise ValueError("percent should be >= 0")
+        self.forced_percent = None if percent is None else int(percent)
+        return {"ok": True}
+
+    def _handle_set(self, request: dict) -> dict:
+        params = {}
+        for key, value in request.items():
+            if key == "cmd":
+                continue
+            if key not in SETTABLE_PARAMS:
+                raise ValueError(f"{key} cannot be set, one of {list(SETTABLE_PARAMS)} expected")
+            params[key] = SETTABLE_PARAMS[key](value)
+        if params.get("max_ram_mega", 100) < 100 or params.get("time_slot_sec", 1) <= 0:
+            raise ValueError("max_ram_mega >= 100 and time_slot_sec > 0 expected")
+        with self._lock:
+            self._pending_params.update(params)
+        return {"ok": True}
+
+    def _handle_pattern(self, request: dict) -> dict:
+        mem_pattern = load_complete_pattern(request["file"])
+        with self._lock:
+            self._pending_pattern = mem_pattern
+        return {"ok": True}
+
+    def take_pending(self) -> tuple:
+        """Returns and clears pending parameter changes and pattern (None if not changed)."""
+        with self._lock:
+            params, mem_pattern = self._pending_params, self._pending_pattern
+            self._pending_params, self._pending_pattern = {}, None
+        return params, mem_pattern
+
+    def publish_status(self, status: dict):
+        """Stores the state of MemConsumer returned by the status request."""
+        with self._lock:
+            self._status = status
+
+
+class _ControlRequestHandler(socketserver.StreamRequestHandler):
+    # idle clients are disconnected, so they do not block the server
+    timeout = 5.0
+
+    def handle(self):
+        try:
+            self._handle_lines()
+        except (TimeoutError, ConnectionError):
+            pass
+
+    def _handle_lines(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = (
+                    self.server.control.handle(request)
+                    if isinstance(request, dict)
+                    else {"ok": False, "error": "JSON object expected"}
+                )
+            except json.JSONDecodeError as err:
+                response = {"ok": False, "error": f"invalid JSON: {err}"}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+def _remove_socket(socket_path: str):
+    """Removes the socket file left at socket_path, other files are not removed.
+
+    Raises
+    ------
+    ValueError
+        If socket_path is not a socket (e.g. a mistyped path of a pattern file).
+    """
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"{socket_path} exists and is not a socket")
+    os.remove(socket_path)
+
+
+class ControlServer(socketserver.UnixStreamServer):
+    """Serves control requests on the Unix socket in a background thread.
+
+    Requests are served one by one in a single thread, so the server does not change
+    memory allocated for the process once it is started (start it before MemConsumer
+    is created, the initial allocation of MemConsumer takes it into account).
+
+    Parameters
+    ----------
+    socket_path : `str`
+        path of the Unix socket, an existing socket file is replaced
+    control : `ConsumerControl`
+        control requests are passed to
+
+    Raises
+    ------
+    ValueError
+        If a file other than a socket exists at socket_path.
+    """
+
+    def __init__(self, socket_path: str, control: ConsumerControl):
+        _remove_socket(socket_path)
+        super().__init__(socket_path, _ControlRequestHandler)
+        self.socket_path = socket_path
+        self.control = control
+        self._thread = None
+        self._started = threading.Event()
+
+    def service_actions(self):
+        """Informs the serving loop is running."""
+        self._started.set()
+
+    def start(self):
+        """Starts serving requests in a daemon thread and waits until it is running."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="mem-consumer-control", daemon=True
+        )
+        self._thread.start()
+        self._started.wait(timeout=5.0)
+
+    def stop(self):
+        """Stops serving requests and removes the socket file."""
+        self.shutdown()
+        self.server_close()
+        _remove_socket(self.socket_path)
+
+
+def send_request(socket_path: str, request: dict, timeout: float = 5.0) -> dict:
+    """Sends the control request to the memory consumer and returns its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as response:
+            return json.loads(response.readline())
@@ -0,0 +1,58 @@
+"""
+Sends control requests to the running memory consumer app.
+"""
+import argparse
+import json
+import sys
+from memory_consumer.control import SETTABLE_PARAMS, send_request
+
+
+def _build_request(args: argparse.Namespace) -> dict:
+    """builds the control request from arguments"""
+    request = {"cmd": args.cmd}
+    if args.cmd == "force":
+        request["percent"] = None if args.value in (None, "off") else int(args.value)
+    elif args.cmd == "pattern":
+        request["file"] = args.value
+    elif args.cmd == "set":
+        for name in SETTABLE_PARAMS:
+            if getattr(args, name) is not None:
+                request[name] = getattr(args, name)
+    return request
+
+
+def main():
+    """starts Memory consumer control app"""
+    parser = argparse.ArgumentParser(description="Memory consumer control")
+    parser.add_argument(
+        "-c",
+        "--control_socket",
+        type=str,
+        required=True,
+        help="Control socket of the memory consumer app (its --control_socket argument).",
+    )
+    parser.add_argument(
+        "cmd",
+        type=str,
+        choices=["status", "pause", "resume", "force", "pattern", "set"],
+        help="status - print the state of the app, pause/resume - stop/restart changing "
+        "the allocation, force - allocate VALUE percent of maximal memory "
+        "(off - follow the pattern again), pattern - use the pattern file VALUE, "
+        "set - change parameters given in options.",
+    )
+    parser.add_argument("value", type=str, nargs="?", default=None)
+    parser.add_argument("-m", "--max_ram_mega", type=int, default=None)
+    parser.add_argument("-n", "--noise_percent", type=int, default=None)
+    parser.add_argument("-t", "--time_slot_sec", type=float, default=None)
+    parser.add_argument("-s", "--linear_trend_slope", type=float, default=None)
+    args = parser.parse_args()
+    if args.cmd == "pattern" and args.value is None:
+        parser.error("pattern file name is required")
+
+    response = send_request(args.control_socket, _build_request(args))
+    print(json.dumps(response, indent=2))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Implements GcMonitor class collecting statistics of the python garbage collector activity.
+"""
+import gc
+from time import perf_counter
+
+
+class GcMonitor:
+    """Collects pause durations of garbage collections through gc.callbacks.
+
+    Statistics are collected per generation and reset every time they are read
+    with step_stats, so they describe a single allocation step.
+
+    Parameters
+    ----------
+    count_tracked : `bool`, default=True
+        flag that if True forces counting objects tracked by the garbage collector
+        in step_stats (the cost grows with the number of objects)
+    """
+
+    def __init__(self, count_tracked: bool = True):
+        self.count_tracked = count_tracked
+        self._start = None
+        self._stats = self._empty_stats()
+        self._installed = False
+
+    @staticmethod
+    def _empty_stats() -> list:
+        return [
+            {"collections": 0, "pause_ms": 0.0, "max_pause_ms": 0.0, "collected": 0}
+            for _ in range(3)
+        ]
+
+    def _callback(self, phase: str, info: dict):
+        if phase == "start":
+            self._start = perf_counter()
+            return
+        if self._start is None:
+            return
+        pause_ms = (perf_counter() - self._start) * 1e3
+        self._start = None
+        stats = self._stats[info["generation"]]
+        stats["collections"] += 1
+        stats["pause_ms"] += pause_ms
+        stats["max_pause_ms"] = max(stats["max_pause_ms"], pause_ms)
+        stats["collected"] += info["collected"]
+
+    def install(self):
+        """Starts collecting statistics."""
+        if not self._installed:
+            gc.callbacks.append(self._callback)
+            self._installed = True
+
+    def uninstall(self):
+        """Stops collecting statistics."""
+        if self._installed:
+            gc.callbacks.remove(self._callback)
+            self._installed = False
+
+    def step_stats(self) -> dict:
+        """Returns statistics collected since the previous call and resets them.
+
+        Returns
+        -------
+        dict
+            Number of collections, total and maximal pause in ms and number of
+            collected objects for every generation (gen0, gen1, gen2), and the number
+            of objects tracked by the garbage collector (if count_tracked is set).
+        """
+        stats = {
+            f"gen{generation}": {
+                key: round(value, 3) if isinstance(value, float) else value
+                for key, value in generation_stats.items()
+            }
+            for generation, generation_stats in enumerate(self._stats)
+        }
+        self._stats = self._empty_stats()
+        if self.count_tracked:
+            stats["tracked_objects"] = len(gc.get_objects())
+        stats["frozen_objects"] = gc.get_freeze_count()
+        return stats
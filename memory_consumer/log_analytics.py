@@ -0,0 +1,342 @@
+"""
+Implements streaming analytics of memory consumer run logs.
+
+Logs are read record by record, so the memory needed for the analysis does not depend
+on the log length.
+"""
+import csv
+import gzip
+import json
+import math
+import os
+import re
+from datetime import datetime
+from memory_consumer.run_log import BINARY_MAGIC, RunLogRecord, read_binary_records
+
+# human-readable allocation step line produced by run_log.render_text
+TEXT_LINE_RE = re.compile(
+    r"^(?P<wall>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d), Allocated (?P<percent>\d+)% "
+    r"of (?P<max>\d+) MB, \(in memory array\) (?P<achieved>-?\d+) MB, "
+    r"\(in process\) (?P<process>\d+) MB for (?P<slot>[\d.]+) sec"
+)
+# resolution of the histograms used to estimate percentiles
+ERROR_BIN_MEGA = 1
+CONVERGENCE_BIN_SEC = 0.1
+
+
+def _open_log(file_name: str, mode: str):
+    if file_name.endswith(".gz"):
+        return gzip.open(file_name, mode)
+    # pylint: disable=consider-using-with
+    return open(file_name, mode)
+
+
+def parse_text_line(line: str) -> RunLogRecord:
+    """Parses human-readable allocation step line.
+
+    Parameters
+    ----------
+    line : str
+        Line of the text run log.
+
+    Returns
+    -------
+    RunLogRecord
+        Parsed record or None if the line is not an allocation step line.
+        The text log does not contain RSS, so it is approximated by memory allocated
+        for the process; the step number is not known and is set to -1.
+    """
+    match = TEXT_LINE_RE.match(line)
+    if match is None:
+        return None
+    wall_time = datetime.strptime(match["wall"], "%Y-%m-%d %H:%M:%S").timestamp()
+    percent, max_ram_mega = int(match["percent"]), int(match["max"])
+    process_mega = int(match["process"])
+    return RunLogRecord(
+        step=-1,
+        mono_time=wall_time,
+        wall_time=wall_time,
+        target_percent=percent,
+        target_mega=percent * max_ram_mega // 100,
+        max_ram_mega=max_ram_mega,
+        achieved_mega=int(match["achieved"]),
+        process_mega=process_mega,
+        rss_mega=process_mega,
+        latency_sec=math.nan,
+        time_slot_sec=float(match["slot"]),
+    )
+
+
+def iter_log_records(file_name: str):
+    """Yields RunLogRecord objects read from run log of any supported format.
+
+    The format (text, jsonl or binary) is detected from the content of the file.
+    Files with the .gz extension are decompressed on the fly.
+    Lines not describing allocation steps (e.g. app start info) are skipped.
+
+    Parameters
+    ----------
+    file_name : str
+        Run log file name.
+    """
+    with _open_log(file_name, "rb") as stream:
+        if stream.peek(len(BINARY_MAGIC))[: len(BINARY_MAGIC)] == BINARY_MAGIC:
+            yield from read_binary_records(stream)
+            return
+        for raw_line in stream:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if line.startswith("{"):
+                yield RunLogRecord(**json.loads(line))
+            else:
+                record = parse_text_line(line)
+                if record is not None:
+                    yield record
+
+
+class StreamingHistogram:
+    """Implements fixed bin histogram used to compute statistics of a stream of values.
+
+    The memory used depends only on the range of values, not on their number.
+
+    Parameters
+    ----------
+    bin_size : `float`
+        width of the histogram bin
+    """
+
+    def __init__(self, bin_size: float):
+        self.bin_size = bin_size
+        self.count = 0
+        self.total = 0.0
+        self.max = -math.inf
+        self._bins = {}
+
+    def add(self, value: float):
+        """Adds the value to the histogram."""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        key = int(value // self.bin_size)
+        self._bins[key] = self._bins.get(key, 0) + 1
+
+    def mean(self) -> float:
+        """Returns mean of added values (nan when empty)."""
+        return self.total / self.count if self.count else math.nan
+
+    def percentile(self, percent: float) -> float:
+        """Returns upper bound of the bin containing the given percentile (nan when empty)."""
+        if not self.count:
+            return math.nan
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for key in sorted(self._bins):
+            seen += self._bins[key]
+            if seen >= rank:
+                return min(self.max, (key + 1) * self.bin_size)
+        return self.max
+
+
+def csv_file_names(logs: list) -> list:
+    """Returns names of the downsampled csv files of the logs.
+
+    Names are built from paths of the logs relative to their common directory
+    with path separators replaced by "_", so logs of the same name in different
+    directories (e.g. w1/run.jsonl and w2/run.jsonl) do not overwrite their csv files.
+
+    Raises
+    ------
+    ValueError
+        If the names are not unique (e.g. a log is given twice).
+    """
+    paths = [os.path.abspath(log) for log in logs]
+    common = os.path.commonpath([os.path.dirname(path) for path in paths])
+    names = [f"{os.path.relpath(path, common).replace(os.sep, '_')}.csv" for path in paths]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"csv files of the logs are not unique: {duplicates}")
+    return names
+
+
+class DownsampledCsvWriter:
+    """Writes averaged run log values for consecutive time windows to csv file.
+
+    Parameters
+    ----------
+    file_name : `str`
+        output csv file name
+    window_sec : `float`
+        length of the averaging time window in seconds
+    """
+
+    FIELDS = ("wall_time", "target_mega", "achieved_mega", "rss_mega", "resets")
+
+    def __init__(self, file_name: str, window_sec: float):
+        self.window_sec = window_sec
+        # pylint: disable=consider-using-with
+        self._file = open(file_name, mode="w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.FIELDS)
+        self._window = None
+        self._sums = [0, 0, 0, 0]
+        self._count = 0
+
+    def add(self, record: RunLogRecord):
+        """Adds the record to the current window, writes the window out when it is over."""
+        window = int(record.wall_time // self.window_sec)
+        if self._window is not None and window != self._window:
+            self._write_window()
+        self._window = window
+        self._sums[0] += record.target_mega
+        self._sums[1] += record.achieved_mega
+        self._sums[2] += record.rss_mega
+        self._sums[3] += int(record.reset)
+        self._count += 1
+
+    def close(self):
+        """Writes the last window out and closes the file."""
+        if self._count:
+            self._write_window()
+        self._file.close()
+
+    def _write_window(self):
+        self._writer.writerow(
+            [
+                datetime.fromtimestamp(self._window * self.window_sec).isoformat(),
+                *(round(value / self._count, 1) for value in self._sums[:3]),
+                self._sums[3],
+            ]
+        )
+        self._sums = [0, 0, 0, 0]
+        self._count = 0
+
+
+# the analyzer keeps running statistics of every summary field
+class LogAnalyzer:  # pylint: disable=too-many-instance-attributes
+    """Computes statistics of a memory consumer run from consecutive log records.
+
+    Parameters
+    ----------
+    tolerance_percent : `float`, default=2.0
+        RSS is treated as matching the target if the absolute error is not greater
+        than tolerance_percent of max_ram_mega
+    """
+
+    def __init__(self, tolerance_percent: float = 2.0):
+        self.tolerance_percent = tolerance_percent
+        self.steps = 0
+        self.resets = 0
+        self.overruns = 0
+        self.major_faults = 0
+        self.max_swap_mega = 0.0
+        self.adherent_steps = 0
+        self.errors = StreamingHistogram(ERROR_BIN_MEGA)
+        self.convergence = StreamingHistogram(CONVERGENCE_BIN_SEC)
+        self.not_converged = 0
+        self.first_time = None
+        self.last_time = None
+        self._last_target = None
+        self._target_change_time = None
+
+    def add(self, record: RunLogRecord):
+        """Updates statistics with the next record of the run log."""
+        self.steps += 1
+        self.resets += int(record.reset)
+        self.overruns += int("overrun_sec" in record.extra)
+        telemetry = record.extra.get("telemetry")
+        if telemetry:
+            self.major_faults += telemetry["major_faults"]
+            # comparison with nan (swap not available) is always False
+            if telemetry["swap_mega"] > self.max_swap_mega:
+                self.max_swap_mega = telemetry["swap_mega"]
+        if self.first_time is None:
+            self.first_time = record.mono_time
+        self.last_time = record.mono_time
+        error = abs(record.rss_mega - record.target_mega)
+        self.errors.add(error)
+        matching = error <= record.max_ram_mega * self.tolerance_percent / 100
+        self.adherent_steps += int(matching)
+        self._track_convergence(record, matching)
+
+    def _track_convergence(self, record: RunLogRecord, matching: bool):
+        if record.target_mega != self._last_target:
+            if self._target_change_time is not None:
+                # the previous target has never been reached
+                self.not_converged += 1
+            self._last_target = record.target_mega
+            self._target_change_time = record.mono_time
+        if matching and self._target_change_time is not None:
+            self.convergence.add(record.mono_time - self._target_change_time)
+            self._target_change_time = None
+
+    def duration_sec(self) -> float:
+        """Returns time between the first and the last analysed record in seconds."""
+        if self.first_time is None:
+            return 0.0
+        return self.last_time - self.first_time
+
+    def summary(self) -> dict:
+        """Returns dictionary with the computed statistics."""
+        hours = self.duration_sec() / 3600
+        return {
+            "steps": self.steps,
+            "duration_sec": round(self.duration_sec(), 1),
+            "mae_mega": round(self.errors.mean(), 2),
+            "max_error_mega": self.errors.max if self.steps else math.nan,
+            "p99_error_mega": self.errors.percentile(99),
+            "adherence_percent": (
+                round(100 * self.adherent_steps / self.steps, 2) if self.steps else math.nan
+            ),
+            "convergence_mean_sec": round(self.convergence.mean(), 2),
+            "convergence_p99_sec": round(self.convergence.percentile(99), 2),
+            "not_converged": self.not_converged
+            + int(self._target_change_time is not None),
+            "resets": self.resets,
+            "resets_per_hour": round(self.resets / hours, 2) if hours else math.nan,
+            "overruns": self.overruns,
+            "major_faults": self.major_faults,
+            "max_swap_mega": round(self.max_swap_mega, 1),
+        }
+
+
+def analyze_log(
+    file_name: str, tolerance_percent: float = 2.0, csv_writer: DownsampledCsvWriter = None
+) -> dict:
+    """Streams the run log through LogAnalyzer.
+
+    Parameters
+    ----------
+    file_name : str
+        Run log file name.
+    tolerance_percent : float
+        Tolerance of the target matching (see LogAnalyzer).
+    csv_writer : DownsampledCsvWriter
+        Optional writer of the downsampled values.
+
+    Returns
+    -------
+    dict
+        Statistics computed by LogAnalyzer.summary().
+    """
+    analyzer = LogAnalyzer(tolerance_percent)
+    for record in iter_log_records(file_name):
+        analyzer.add(record)
+        if csv_writer is not None:
+            csv_writer.add(record)
+    return analyzer.summary()
+
+
+def format_summary_table(summaries: dict) -> str:
+    """Formats statistics of many logs as a plain text table, one log per row."""
+    if not summaries:
+        return ""
+    columns = ["log", *next(iter(summaries.values())).keys()]
+    rows = [[name, *summary.values()] for name, summary in summaries.items()]
+    widths = [
+        max(len(str(column)), *(len(str(row[i])) for row in rows))
+        for i, column in enumerate(columns)
+    ]
+    lines = [
+        "  ".join(str(value).rjust(width) for value, width in zip(line, widths))
+        for line in [columns, *rows]
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,805 @@
+"""
+Implements backends allocating memory chunks for MemConsumer.
+"""
+import ctypes
+import ctypes.util
+import gc
+import math
+import mmap
+import os
+import random
+import tempfile
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from time import perf_counter
+import psutil
+from memory_consumer.gc_monitor import GcMonitor
+
+MEGA = 10**6
+# mallopt parameter number of the maximal number of malloc arenas (glibc)
+M_ARENA_MAX = -8
+# supported size distributions of native heap blocks
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+# supported kinds of python object graphs
+OBJECT_KINDS = ("dict", "list", "cyclic")
+# number of graph units built to measure the size of a single unit
+CALIBRATION_UNITS = 2000
+# supported kinds of shared memory segments
+SHM_KINDS = ("memfd", "devshm")
+# size of the block used to write files and touch memory pages
+IO_BLOCK = 1 << 20
+
+
+class MemBackend:
+    """Implements the default backend allocating memory chunks as bytearray objects.
+
+    Backends create chunk objects of the required size and free them when MemConsumer
+    removes them from its memory array. Subclasses consume memory in other ways.
+    """
+
+    name = "bytearray"
+    # True if memory of the chunks is accounted in the process memory,
+    # MemConsumer corrects allocation by the initial process memory only then
+    counts_in_rss = True
+    # True if process memory is expected to follow the allocated chunks closely,
+    # otherwise MemConsumer does not reset the memory array on mismatch
+    rss_tracks_chunks = True
+    # True if memory of every chunk is a contiguous buffer (see chunk_buffer)
+    buffer_chunks = True
+
+    def __init__(self):
+        self._live_bytes = 0
+
+    def __repr__(self):
+        return f"MemBackend: {self.name}"
+
+    def allocate(self, size_bytes: int):
+        """Returns a new memory chunk of size_bytes bytes."""
+        self._live_bytes += size_bytes
+        return bytearray(size_bytes)
+
+    def release(self, chunk):
+        """Frees the memory chunk removed from the memory array."""
+        self._live_bytes -= len(chunk)
+
+    def after_change(self):
+        """Called once after every change of allocation."""
+
+    def live_bytes(self) -> int:
+        """Returns number of bytes held in the allocated chunks."""
+        return self._live_bytes
+
+    def chunk_buffer(self, chunk):
+        """Returns writable buffer of the chunk memory (e.g. to madvise it),
+        used only if buffer_chunks is set."""
+        return chunk
+
+    def step_stats(self) -> dict:
+        """Returns backend specific statistics of the last allocation step."""
+        return {}
+
+    def memory_info(self) -> str:
+        """Returns backend specific info on how its memory is accounted in the system."""
+        return ""
+
+    def close(self):
+        """Frees resources held by the backend."""
+
+
+# the parameters describe the block size distribution and the allocating threads
+@dataclass(init=True, repr=True)
+class MallocChurnParams:  # pylint: disable=too-many-instance-attributes
+    """Stores parameters for MallocChurnBackend.
+
+    Arguments:
+
+    size_distribution : `str`, default="lognormal"
+        distribution of block sizes, one of SIZE_DISTRIBUTIONS
+    min_size : `int`, default=16
+        minimal block size in bytes
+    max_size : `int`, default=256*1024
+        maximal block size in bytes
+    mean_size : `int`, default=2048
+        mean block size in bytes (the block size for the fixed distribution)
+    lifetime_steps : `float`, default=0.0
+        mean lifetime of a block in allocation steps, blocks are freed
+        and allocated again (with a new size) when their lifetime is over,
+        0 means blocks live as long as their chunk
+    threads : `int`, default=4
+        number of threads allocating and freeing blocks
+    arena_max : `int`, default=0
+        maximal number of malloc arenas (as MALLOC_ARENA_MAX), 0 means the libc default
+    trim : `bool`, default=False
+        flag that if True forces malloc_trim after blocks are freed
+    seed : `int`, default=None
+        seed of the block sizes and lifetimes generator
+    """
+
+    size_distribution: str = "lognormal"
+    min_size: int = 16
+    max_size: int = 256 * 1024
+    mean_size: int = 2048
+    lifetime_steps: float = 0.0
+    threads: int = 4
+    arena_max: int = 0
+    trim: bool = False
+    seed: int = None
+
+
+class _BlockSlice:  # pylint: disable=too-few-public-methods
+    """Native heap blocks of a chunk allocated by a single thread (a plain record)."""
+
+    __slots__ = ("ptrs", "sizes", "expiry")
+
+    def __init__(self):
+        self.ptrs = array("Q")
+        self.sizes = array("Q")
+        self.expiry = array("q")
+
+
+class _MallocChunk:  # pylint: disable=too-few-public-methods
+    """Memory chunk made of many native heap blocks (a plain record)."""
+
+    __slots__ = ("slices", "next_expiry")
+
+    def __init__(self, slices: list, next_expiry: int):
+        self.slices = slices
+        self.next_expiry = next_expiry
+
+
+def _check_malloc_params(params: MallocChurnParams):
+    """Raises ValueError if the malloc backend parameters are wrong."""
+    if params.size_distribution not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"size_distribution should be one of {SIZE_DISTRIBUTIONS}")
+    if not 1 <= params.min_size <= params.mean_size <= params.max_size:
+        raise ValueError("block sizes 1 <= min_size <= mean_size <= max_size expected")
+    if params.threads < 1:
+        raise ValueError("threads >= 1 expected")
+    if params.lifetime_steps < 0 or params.arena_max < 0:
+        raise ValueError("lifetime_steps >= 0 and arena_max >= 0 expected")
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    libc.malloc.restype = ctypes.c_void_p
+    libc.malloc.argtypes = [ctypes.c_size_t]
+    libc.free.restype = None
+    libc.free.argtypes = [ctypes.c_void_p]
+    return libc
+
+
+# the backend keeps the thread pool, the libc handle and the churn state
+class MallocChurnBackend(MemBackend):  # pylint: disable=too-many-instance-attributes
+    """Implements backend consuming memory as many small and medium native heap blocks.
+
+    Every chunk is split into blocks (malloc) of sizes drawn from the configured
+    distribution, allocated and touched by a pool of threads, so the blocks are spread
+    over many malloc arenas. Blocks whose lifetime is over are freed and allocated
+    again after every allocation step, which fragments the arenas. Fragmentation
+    overhead is reported as RSS minus live bytes (and minus the initial RSS).
+
+    Parameters
+    ----------
+    params : MallocChurnParams
+        parameters of the backend
+
+    Raises
+    ------
+    ValueError
+        If the parameters are wrong (see _check_malloc_params).
+    """
+
+    name = "malloc"
+    rss_tracks_chunks = False
+    buffer_chunks = False
+
+    def __init__(self, params: MallocChurnParams = None):
+        super().__init__()
+        self.params = params if params is not None else MallocChurnParams()
+        _check_malloc_params(self.params)
+        self._libc = _load_libc()
+        if self.params.arena_max > 0:
+            if not hasattr(self._libc, "mallopt"):
+                raise OSError("mallopt is not available in the C library")
+            self._libc.mallopt(M_ARENA_MAX, self.params.arena_max)
+        self._rng = random.Random(self.params.seed)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.params.threads, thread_name_prefix="malloc-churn"
+        )
+        self._process = psutil.Process(os.getpid())
+        self._initial_rss = self._process.memory_info().rss
+        self._chunks = set()
+        self._step = 0
+        self._freed = False
+        self._last_stats = {}
+
+    def __repr__(self):
+        return f"MemBackend: {self.name}, {self.params}"
+
+    def _block_size(self) -> int:
+        params = self.params
+        if params.size_distribution == "fixed":
+            return params.mean_size
+        if params.size_distribution == "uniform":
+            return self._rng.randint(params.min_size, params.max_size)
+        sigma = 1.0
+        size = self._rng.lognormvariate(math.log(params.mean_size) - sigma**2 / 2, sigma)
+        return int(min(params.max_size, max(params.min_size, size)))
+
+    def _lifetime(self) -> int:
+        if self.params.lifetime_steps <= 0:
+            return -1
+        lifetime = math.ceil(self._rng.expovariate(1 / self.params.lifetime_steps))
+        return self._step + max(1, lifetime)
+
+    def _alloc_blocks(self, block_slice: _BlockSlice, sizes: list, expiry: list):
+        """Allocates and touches blocks, run by a thread of the pool."""
+        malloc, memset = self._libc.malloc, ctypes.memset
+        for size, block_expiry in zip(sizes, expiry):
+            ptr = malloc(size)
+            if ptr is None:
+                raise MemoryError(f"malloc of {size} bytes failed")
+            memset(ptr, 1, size)
+            block_slice.ptrs.append(ptr)
+            block_slice.sizes.append(size)
+            block_slice.expiry.append(block_expiry)
+
+    def _free_blocks(self, block_slice: _BlockSlice):
+        free = self._libc.free
+        for ptr in block_slice.ptrs:
+            free(ptr)
+        del block_slice.ptrs[:]
+
+    def _run_in_pool(self, func, *args_lists):
+        futures = [self._pool.submit(func, *args) for args in zip(*args_lists)]
+        for future in futures:
+            future.result()
+
+    def allocate(self, size_bytes: int):
+        sizes, allocated = [], 0
+        while allocated < size_bytes:
+            size = min(self._block_size(), size_bytes - allocated)
+            sizes.append(size)
+            allocated += size
+        expiry = [self._lifetime() for _ in sizes]
+        threads = self.params.threads
+        slices = [_BlockSlice() for _ in range(threads)]
+        self._run_in_pool(
+            self._alloc_blocks,
+            slices,
+            [sizes[i::threads] for i in range(threads)],
+            [expiry[i::threads] for i in range(threads)],
+        )
+        chunk = _MallocChunk(slices, min((e for e in expiry if e >= 0), default=-1))
+        self._chunks.add(chunk)
+        self._live_bytes += allocated
+        return chunk
+
+    def release(self, chunk):
+        self._chunks.discard(chunk)
+        self._live_bytes -= sum(sum(s.sizes) for s in chunk.slices)
+        self._run_in_pool(self._free_blocks, chunk.slices)
+        self._freed = True
+
+    def _churn_blocks(self, block_slice: _BlockSlice, renewed: list) -> int:
+        """Frees blocks with expired lifetime and allocates new ones, run by a pool thread.
+
+        Parameters
+        ----------
+        block_slice : _BlockSlice
+            Blocks allocated by a single thread.
+        renewed : list
+            Tuples (block index, new size, new expiry) of the blocks to be renewed.
+
+        Returns
+        -------
+        int
+            Change of the live bytes.
+        """
+        malloc, free, memset = self._libc.malloc, self._libc.free, ctypes.memset
+        delta = 0
+        for i, size, block_expiry in renewed:
+            free(block_slice.ptrs[i])
+            ptr = malloc(size)
+            if ptr is None:
+                raise MemoryError(f"malloc of {size} bytes failed")
+            memset(ptr, 1, size)
+            delta += size - block_slice.sizes[i]
+            block_slice.ptrs[i] = ptr
+            block_slice.sizes[i] = size
+            block_slice.expiry[i] = block_expiry
+        return delta
+
+    def _churn(self) -> int:
+        """Renews blocks with expired lifetime, returns the number of renewed blocks."""
+        churned = 0
+        for chunk in self._chunks:
+            if not 0 <= chunk.next_expiry <= self._step:
+                continue
+            # new sizes and lifetimes are drawn in the calling thread,
+            # so the generator is not shared between threads
+            renewed = [
+                [
+                    (i, self._block_size(), self._lifetime())
+                    for i, block_expiry in enumerate(block_slice.expiry)
+                    if 0 <= block_expiry <= self._step
+                ]
+                for block_slice in chunk.slices
+            ]
+            futures = [
+                self._pool.submit(self._churn_blocks, block_slice, slice_renewed)
+                for block_slice, slice_renewed in zip(chunk.slices, renewed)
+            ]
+            for future in futures:
+                self._live_bytes += future.result()
+            churned += sum(len(slice_renewed) for slice_renewed in renewed)
+            chunk.next_expiry = min(
+                (e for s in chunk.slices for e in s.expiry if e >= 0), default=-1
+            )
+        return churned
+
+    def after_change(self):
+        start = perf_counter()
+        churned = self._churn() if self.params.lifetime_steps > 0 else 0
+        churn_time = perf_counter() - start
+        trim_time = 0.0
+        if self.params.trim and (self._freed or churned):
+            start = perf_counter()
+            self._libc.malloc_trim(0)
+            trim_time = perf_counter() - start
+        self._freed = False
+        self._step += 1
+        rss = self._process.memory_info().rss
+        self._last_stats = {
+            "live_mega": round(self._live_bytes / MEGA, 1),
+            "fragmentation_mega": round(
+                (rss - self._initial_rss - self._live_bytes) / MEGA, 1
+            ),
+            "churned_blocks": churned,
+            "churn_ms": round(churn_time * 1e3, 2),
+            "trim_ms": round(trim_time * 1e3, 2),
+        }
+
+    def step_stats(self) -> dict:
+        return self._last_stats
+
+    def memory_info(self) -> str:
+        stats = self._last_stats
+        if not stats:
+            return ""
+        return (
+            f"malloc live = {stats['live_mega']:.0f}MB, "
+            f"fragmentation (RSS - live) = {stats['fragmentation_mega']:.0f}MB"
+        )
+
+    def close(self):
+        for chunk in list(self._chunks):
+            self.release(chunk)
+        self._pool.shutdown()
+
+
+@dataclass(init=True, repr=True)
+class ObjectGraphParams:
+    """Stores parameters for ObjectGraphBackend.
+
+    Arguments:
+
+    object_kind : `str`, default="cyclic"
+        kind of object graph units, one of OBJECT_KINDS
+    gc_threshold : `tuple`, default=None
+        garbage collector thresholds set with gc.set_threshold,
+        if not provided the current thresholds are kept
+    gc_freeze : `bool`, default=False
+        flag that if True forces moving allocated objects to the permanent
+        generation (gc.freeze) after every allocation step
+    count_tracked : `bool`, default=True
+        flag that if True forces counting objects tracked by the garbage collector
+        every step
+    """
+
+    object_kind: str = "cyclic"
+    gc_threshold: tuple = None
+    gc_freeze: bool = False
+    count_tracked: bool = True
+
+
+def _dict_unit(i: int):
+    return {"id": i, "name": f"object-{i}", "values": [i, i + 1, i + 2, i + 3]}
+
+
+def _list_unit(i: int):
+    return [i, float(i), f"object-{i}", (i, i + 1), [i, i + 1, i + 2]]
+
+
+def _cyclic_unit(i: int):
+    parent = {"id": i, "name": f"object-{i}", "children": []}
+    child = {"id": -i, "parent": parent, "values": [i, i + 1]}
+    parent["children"].append(child)
+    return parent
+
+
+UNIT_BUILDERS = {"dict": _dict_unit, "list": _list_unit, "cyclic": _cyclic_unit}
+
+
+class ObjectGraphBackend(MemBackend):
+    """Implements backend consuming memory as graphs of python objects.
+
+    Every chunk is a list of small units made of dicts, lists, strings and numbers
+    (the cyclic units reference each other, so they are freed by the garbage
+    collector only). The size of a unit is measured with tracemalloc when the backend
+    is created. Garbage collector activity is reported per step by GcMonitor.
+
+    Parameters
+    ----------
+    params : ObjectGraphParams
+        parameters of the backend
+    """
+
+    name = "objects"
+    rss_tracks_chunks = False
+    buffer_chunks = False
+
+    def __init__(self, params: ObjectGraphParams = None):
+        super().__init__()
+        self.params = params if params is not None else ObjectGraphParams()
+        if self.params.object_kind not in OBJECT_KINDS:
+            raise ValueError(f"object_kind should be one of {OBJECT_KINDS}")
+        self._build_unit = UNIT_BUILDERS[self.params.object_kind]
+        if self.params.gc_threshold is not None:
+            gc.set_threshold(*self.params.gc_threshold)
+        self.unit_bytes = self._measure_unit_bytes()
+        self.gc_monitor = GcMonitor(self.params.count_tracked)
+        self.gc_monitor.install()
+        self._freed = False
+        self._last_stats = {}
+
+    def __repr__(self):
+        return f"MemBackend: {self.name}, {self.params}, unit size={self.unit_bytes}B"
+
+    def _measure_unit_bytes(self) -> int:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        units = [self._build_unit(i) for i in range(CALIBRATION_UNITS)]
+        unit_bytes = (tracemalloc.get_traced_memory()[0] - before) // len(units)
+        if not tracing:
+            tracemalloc.stop()
+        return max(1, unit_bytes)
+
+    def allocate(self, size_bytes: int):
+        units = size_bytes // self.unit_bytes
+        build_unit = self._build_unit
+        chunk = [build_unit(i) for i in range(units)]
+        self._live_bytes += units * self.unit_bytes
+        return chunk
+
+    def release(self, chunk):
+        self._live_bytes -= len(chunk) * self.unit_bytes
+        self._freed = True
+
+    def after_change(self):
+        collect_time = 0.0
+        if self.params.gc_freeze:
+            if self._freed:
+                # released objects have to leave the permanent generation to be collected
+                gc.unfreeze()
+                start = perf_counter()
+                gc.collect()
+                collect_time = perf_counter() - start
+            gc.freeze()
+        self._freed = False
+        self._last_stats = {
+            "live_mega": round(self._live_bytes / MEGA, 1),
+            "collect_ms": round(collect_time * 1e3, 2),
+            "gc": self.gc_monitor.step_stats(),
+        }
+
+    def step_stats(self) -> dict:
+        return self._last_stats
+
+    def memory_info(self) -> str:
+        stats = self._last_stats
+        if not stats:
+            return ""
+        tracked = stats["gc"].get("tracked_objects")
+        return f"objects live = {stats['live_mega']:.0f}MB" + (
+            f", gc tracked objects = {tracked}" if tracked is not None else ""
+        )
+
+    def close(self):
+        self.gc_monitor.uninstall()
+        if self.params.gc_freeze:
+            gc.unfreeze()
+
+
+def _touch(buffer, size: int):
+    """Writes to every page of the buffer, so the pages are allocated."""
+    block = b"\x01" * IO_BLOCK
+    for offset in range(0, size, IO_BLOCK):
+        length = min(IO_BLOCK, size - offset)
+        buffer[offset : offset + length] = block[:length]
+
+
+def _system_memory_mega() -> dict:
+    sv_mem = psutil.virtual_memory()
+    return {
+        "cached": sv_mem.cached / MEGA,
+        "shared": sv_mem.shared / MEGA,
+    }
+
+
+def _unlinked_file(directory: str) -> int:
+    """Creates a file in the directory and removes its name at once.
+
+    The file lives as long as its descriptor is open, so nothing is left behind
+    when the process is killed (e.g. OOM-killed).
+    """
+    fd, path = tempfile.mkstemp(prefix="mem_consumer_", dir=directory)
+    os.unlink(path)
+    return fd
+
+
+def _shared_memory_stats(process: psutil.Process, initial: dict) -> dict:
+    """Returns shared memory of the process and of the system (with its change since start)."""
+    system = _system_memory_mega()
+    return {
+        "process_shared_mega": round(process.memory_info().shared / MEGA, 1),
+        "system_shared_mega": round(system["shared"], 1),
+        "shared_change_mega": round(system["shared"] - initial["shared"], 1),
+    }
+
+
+def _shared_memory_info(stats: dict) -> str:
+    """Formats shared memory statistics (see _shared_memory_stats)."""
+    return (
+        f"process shared = {stats['process_shared_mega']:.0f}MB, "
+        f"system shared = {stats['system_shared_mega']:.0f}MB "
+        f"({stats['shared_change_mega']:+.0f}MB since start)"
+    )
+
+
+class _FileChunk:  # pylint: disable=too-few-public-methods
+    """Memory chunk backed by an unlinked file, optionally mapped to the process memory
+    (a plain record)."""
+
+    __slots__ = ("fd", "size", "mapping")
+
+    def __init__(self, fd: int, size: int, mapping=None):
+        self.fd = fd
+        self.size = size
+        self.mapping = mapping
+
+
+class PageCacheBackend(MemBackend):
+    """Implements backend consuming memory as page cache of files.
+
+    Every chunk is a file of the chunk size, written and read back, so its pages
+    stay in the page cache. The memory is not accounted in the process RSS,
+    but in the system (and cgroup) file cache, which is reclaimed by the kernel
+    under memory pressure. The files are unlinked when created, so closing
+    a released file frees its pages (without writing them back).
+
+    Parameters
+    ----------
+    directory : `str`, default=None
+        directory the files are created in (it should not be tmpfs),
+        if not provided /var/tmp or the system temporary directory is used
+    keep_hot : `bool`, default=False
+        flag that if True forces reading all files after every allocation step,
+        so their pages stay in the active LRU list
+    """
+
+    name = "pagecache"
+    counts_in_rss = False
+    rss_tracks_chunks = False
+    buffer_chunks = False
+
+    def __init__(self, directory: str = None, keep_hot: bool = False):
+        super().__init__()
+        if directory is None:
+            directory = "/var/tmp" if os.path.isdir("/var/tmp") else tempfile.gettempdir()
+        self.directory = directory
+        self.keep_hot = keep_hot
+        self._chunks = []
+        self._initial = _system_memory_mega()
+        self._read_buffer = bytearray(IO_BLOCK)
+
+    def __repr__(self):
+        return f"MemBackend: {self.name}, directory={self.directory}, keep hot={self.keep_hot}"
+
+    def _read(self, chunk: _FileChunk):
+        view = memoryview(self._read_buffer)
+        for offset in range(0, chunk.size, IO_BLOCK):
+            os.preadv(chunk.fd, [view[: min(IO_BLOCK, chunk.size - offset)]], offset)
+
+    def allocate(self, size_bytes: int):
+        fd = _unlinked_file(self.directory)
+        block = b"\x01" * IO_BLOCK
+        for offset in range(0, size_bytes, IO_BLOCK):
+            os.pwrite(fd, block[: min(IO_BLOCK, size_bytes - offset)], offset)
+        chunk = _FileChunk(fd, size_bytes)
+        self._read(chunk)
+        self._chunks.append(chunk)
+        self._live_bytes += size_bytes
+        return chunk
+
+    def release(self, chunk):
+        self._chunks.remove(chunk)
+        self._live_bytes -= chunk.size
+        # the file is unlinked, closing its last descriptor drops its pages
+        os.close(chunk.fd)
+
+    def after_change(self):
+        if self.keep_hot:
+            for chunk in self._chunks:
+                self._read(chunk)
+
+    def step_stats(self) -> dict:
+        system = _system_memory_mega()
+        return {
+            "files_mega": round(self._live_bytes / MEGA, 1),
+            "system_cached_mega": round(system["cached"], 1),
+            "cached_change_mega": round(system["cached"] - self._initial["cached"], 1),
+        }
+
+    def memory_info(self) -> str:
+        stats = self.step_stats()
+        return (
+            f"page cache files = {stats['files_mega']:.0f}MB (not in process RSS), "
+            f"system cached = {stats['system_cached_mega']:.0f}MB "
+            f"({stats['cached_change_mega']:+.0f}MB since start)"
+        )
+
+    def close(self):
+        for chunk in list(self._chunks):
+            self.release(chunk)
+
+
+class ShmBackend(MemBackend):
+    """Implements backend consuming memory as shared memory (shmem/tmpfs) segments.
+
+    Every chunk is a memfd (anonymous file in memory) or a file in /dev/shm
+    of the chunk size (unlinked at once, so it is freed even if the process is killed),
+    mapped to the process memory and written. The memory
+    is accounted in the process RSS as shared memory (RssShmem) and in the system
+    Shmem, it is not reclaimed without swap.
+
+    Parameters
+    ----------
+    kind : `str`, default="memfd"
+        kind of shared memory segments, one of SHM_KINDS
+    """
+
+    name = "shm"
+
+    def __init__(self, kind: str = "memfd"):
+        super().__init__()
+        if kind not in SHM_KINDS:
+            raise ValueError(f"kind should be one of {SHM_KINDS}")
+        self.kind = kind
+        self._chunks = []
+        self._process = psutil.Process(os.getpid())
+        self._initial = _system_memory_mega()
+
+    def __repr__(self):
+        return f"MemBackend: {self.name}, kind={self.kind}"
+
+    def allocate(self, size_bytes: int):
+        if self.kind == "memfd":
+            fd = os.memfd_create("mem_consumer")
+        else:
+            fd = _unlinked_file("/dev/shm")
+        os.ftruncate(fd, size_bytes)
+        mapping = mmap.mmap(fd, size_bytes)
+        _touch(mapping, size_bytes)
+        chunk = _FileChunk(fd, size_bytes, mapping)
+        self._chunks.append(chunk)
+        self._live_bytes += size_bytes
+        return chunk
+
+    def release(self, chunk):
+        self._chunks.remove(chunk)
+        self._live_bytes -= chunk.size
+        chunk.mapping.close()
+        os.close(chunk.fd)
+
+    def chunk_buffer(self, chunk):
+        return chunk.mapping
+
+    def step_stats(self) -> dict:
+        return {
+            "segments_mega": round(self._live_bytes / MEGA, 1),
+            **_shared_memory_stats(self._process, self._initial),
+        }
+
+    def memory_info(self) -> str:
+        stats = self.step_stats()
+        return f"{self.kind} segments = {stats['segments_mega']:.0f}MB, " + (
+            _shared_memory_info(stats)
+        )
+
+    def close(self):
+        for chunk in list(self._chunks):
+            self.release(chunk)
+
+
+class SharedMemoryBackend(MemBackend):
+    """Implements backend consuming memory as multiprocessing.shared_memory blocks.
+
+    The blocks are named with the prefix and the chunk position, so many processes
+    (e.g. a fleet of memory consumers on one node) using the same prefix share the same
+    blocks: the first process creates and writes a block, the others attach and read it.
+    Shared pages are accounted in RSS of every process mapping them, but only once
+    in the system Shmem. The block is removed by its creator when released.
+
+    Parameters
+    ----------
+    name_prefix : `str`, default="mem_consumer"
+        prefix of the shared memory block names
+    """
+
+    name = "sharedmem"
+    rss_tracks_chunks = False
+
+    def __init__(self, name_prefix: str = "mem_consumer"):
+        super().__init__()
+        self.name_prefix = name_prefix
+        self._blocks = []
+        self._created = set()
+        self._process = psutil.Process(os.getpid())
+        self._initial = _system_memory_mega()
+
+    def __repr__(self):
+        return f"MemBackend: {self.name}, name prefix={self.name_prefix}"
+
+    def allocate(self, size_bytes: int):
+        name = f"{self.name_prefix}_{len(self._blocks)}"
+        try:
+            block = shared_memory.SharedMemory(name=name, create=True, size=size_bytes)
+            _touch(block.buf, size_bytes)
+            self._created.add(name)
+        except FileExistsError:
+            block = shared_memory.SharedMemory(name=name)
+            # the block belongs to its creator, this process must not remove it at exit
+            # pylint: disable=protected-access
+            resource_tracker.unregister(block._name, "shared_memory")
+            # reading maps the shared pages into this process
+            bytes(block.buf[::mmap.PAGESIZE])
+        self._blocks.append(block)
+        self._live_bytes += block.size
+        return block
+
+    def release(self, chunk):
+        self._blocks.remove(chunk)
+        self._live_bytes -= chunk.size
+        chunk.close()
+        if chunk.name in self._created:
+            self._created.discard(chunk.name)
+            chunk.unlink()
+
+    def chunk_buffer(self, chunk):
+        return chunk.buf
+
+    def step_stats(self) -> dict:
+        return {
+            "blocks_mega": round(self._live_bytes / MEGA, 1),
+            "created_blocks": len(self._created),
+            "attached_blocks": len(self._blocks) - len(self._created),
+            **_shared_memory_stats(self._process, self._initial),
+        }
+
+    def memory_info(self) -> str:
+        stats = self.step_stats()
+        return (
+            f"shared memory blocks = {stats['blocks_mega']:.0f}MB "
+            f"({stats['created_blocks']} created, {stats['attached_blocks']} attached), "
+            + _shared_memory_info(stats)
+        )
+
+    def close(self):
+        for block in list(self._blocks):
+            self.release(block)
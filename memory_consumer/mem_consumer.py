@@ -3,11 +3,19 @@ Implements RamConsumer class able to consume RAM according to given time-depende
 """
 import gc
 import os
+import random
 from dataclasses import dataclass
-from time import sleep
+from time import sleep, monotonic, time
 from datetime import datetime, timedelta
 import psutil
+from memory_consumer.checkpoint import CheckpointStore, RunCheckpoint, rng_state_from_json
+from memory_consumer.cold_memory import ColdMemory
+from memory_consumer.control import ConsumerControl, load_complete_pattern
+from memory_consumer.mem_backends import MemBackend
 from memory_consumer.mem_pattern import MemPattern
+from memory_consumer.ramp import ramp_times
+from memory_consumer.run_log import RunLogRecord, RunLogWriter
+from memory_consumer.telemetry import StepTelemetry, TelemetryProbe, read_swap_mega
 
 MEGA = 10**6
 # assumed that one chunk is 1% of maximal memory to be allocated
@@ -17,12 +25,16 @@ SLEEP_TIME_AFTER_ALLOCATION = 0.3  # second
 # if difference between memory allocated at os level and in the array
 # in number of memory chunks
 RESET_OF_ALLOCATION_THRESHOLD = 3
+# part of the timeslot (without the settle time) paced allocation changes are spread over,
+# the rest is left for memory probes and logging
+RAMP_WINDOW_FRACTION = 0.9
 # experimentally selected thresholds for gc
 # gc.set_threshold(300, 10, 10)
 
 
+# every option of the run is a field, grouping them would only nest the command line options
 @dataclass(init=True, repr=True)
-class MemConsumerParams:
+class MemConsumerParams:  # pylint: disable=too-many-instance-attributes
     """Stores parameters for MemConsumer.
 
     Arguments:
@@ -38,6 +50,16 @@ class MemConsumerParams:
         if False (default) RAM usage pattern is used from time of process start
     duration_sec : `int`, default=-1
         how long the process should run in seconds
+    speed_up : `float`, default=1.0
+        how many times faster than wall time the pattern is played,
+        time_slot_sec and duration_sec are expressed in the pattern time
+    ramp_shape : `str`, default="step"
+        shape of the allocation change within the timeslot (see ramp.RAMP_SHAPES),
+        step - the whole change at the timeslot start
+    alloc_rate_mega_sec : `float`, default=0.0
+        maximal rate of allocation in MB per wall time second, 0 - not limited
+    release_rate_mega_sec : `float`, default=0.0
+        maximal rate of release in MB per wall time second, 0 - not limited
     """
 
     max_ram_mega: int = 10**3
@@ -45,9 +67,14 @@ class MemConsumerParams:
     linear_trend_slope: float = 0.0
     start_from_beginning: bool = False
     duration_sec: int = -1
+    speed_up: float = 1.0
+    ramp_shape: str = "step"
+    alloc_rate_mega_sec: float = 0.0
+    release_rate_mega_sec: float = 0.0
 
 
-class MemConsumer:
+# the consumer keeps the run state (memory array, correction, rate limits, overruns)
+class MemConsumer:  # pylint: disable=too-many-instance-attributes
     """Implements memory consumer class.
 
     Parameters
@@ -56,19 +83,71 @@ class MemConsumer:
         memory usage pattern object
     mc_params : MemConsumerParams
         memory consumer parameters
+    run_log : RunLogWriter, default=None
+        writer of the allocation steps log, if not provided
+        the steps are logged to stdout in the text format
+    backend : MemBackend, default=None
+        backend allocating memory chunks, if not provided
+        the chunks are allocated as bytearray objects
+    control : ConsumerControl, default=None
+        (keyword only) runtime control requests (parameter changes, pause, forced target,
+        pattern swap) applied at the beginning of every allocation step
+    cold_memory : ColdMemory, default=None
+        (keyword only) marks a part of allocated chunks as cold after every allocation change
+    checkpoint : CheckpointStore, default=None
+        (keyword only) the run state is written to the checkpoint periodically
+        and the run is resumed from the checkpoint when it is started again
     """
 
-    def __init__(self, mem_pattern: MemPattern, mc_params: MemConsumerParams):
+    # optional collaborators are keyword only, each of them switches on a feature of the run
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        mem_pattern: MemPattern,
+        mc_params: MemConsumerParams,
+        run_log: RunLogWriter = None,
+        backend: MemBackend = None,
+        *,
+        control: ConsumerControl = None,
+        cold_memory: ColdMemory = None,
+        checkpoint: CheckpointStore = None,
+    ):
         # pattern instance generates time-dependent amounts of memory with some noise
         self.mem_pattern = mem_pattern
         self.mc_params = mc_params
+        self.run_log = run_log if run_log is not None else RunLogWriter()
+        self.backend = backend if backend is not None else MemBackend()
+        self.control = control
+        self.cold_memory = cold_memory
+        self.checkpoint = checkpoint
+        # the process handle is kept to make memory probes cheap
+        self.__process = psutil.Process(os.getpid())
+        # resource usage (faults, CPU time, context switches) of the last allocation change
+        self.__telemetry_probe = TelemetryProbe()
+        self.last_telemetry = StepTelemetry()
         # memory array used to allocate memory
         self.__memory_arr = []
-        # chunks size in MB
+        # chunks size in MB, kept when max_ram_mega is changed at runtime
         self.chunk_size_mega = self.mc_params.max_ram_mega // MAX_NUMBER_OF_CHUNKS
+        self.__initial_max_ram_mega = self.mc_params.max_ram_mega
+        # state of the running process used by runtime control
+        self.__run_start = datetime.now()
+        self.__time_shift = timedelta(seconds=0)
+        self.__steps_number = -1
+        self.__pattern_signature = self._pattern_file_signature()
+        # monotonic times the allocation (1) and release (-1) rate limits are counted from,
+        # the last chunk changed under the limit, kept across allocation steps
+        self.__rate_reference = {}
+        # steps not finished within the timeslot and the maximal overrun in seconds
+        self.__overruns = 0
+        self.__max_overrun = 0.0
         # initial memory allocated for the process
         # consumer corrects allocation subtracting the initial allocation
-        proc = int(round(self.os_allocated_memory_mega(), 0))
+        # (only if the backend memory is accounted in the process memory)
+        proc = (
+            int(round(self.os_allocated_memory_mega(), 0))
+            if self.backend.counts_in_rss
+            else 0
+        )
         # initial memory allocated in number of chunks
         self.__correction = proc // self.chunk_size_mega
         # initial memory rest, taking into account chunk size
@@ -86,8 +165,11 @@ class MemConsumer:
             f"allocation change interval: {self.mc_params.time_slot_sec}s, "
             f"memory chunk size: {self.chunk_size_mega}MB, "
             f"linear trend slope {self.mc_params.linear_trend_slope}, "
+            f"backend: {self.backend.name}, "
             f"start from pattern beginning: {self.mc_params.start_from_beginning}, "
-            f"duration: {duration_str}\n"
+            f"duration: {duration_str}, "
+            f"speed-up: {self.mc_params.speed_up}, "
+            f"ramp: {self.mc_params.ramp_shape}\n"
             f"MemConsumer: initial allocation (minimum allocated memory): "
             f"{self.__correction * self.chunk_size_mega}MB, "
             f"correction rest: {self.__correction_rest}MB"
@@ -112,13 +194,21 @@ class MemConsumer:
             f"total = {tot:.0f}MB, avail = {avail:.0f}MB, used = {used:.0f}MB, "
             f"free = {free:.0f}MB, percent = {percent:.1f}"
         )
+        backend_info = self.backend.memory_info()
+        if backend_info:
+            info += f", {backend_info}"
         return info
 
     # @staticmethod
     def os_allocated_memory_mega(self) -> int:
         """Returns memory allocated for the process in MB, rounded to ten of MB."""
-        process = psutil.Process(os.getpid())
-        return int(round(process.memory_info()[1] // MEGA, 0))
+        return int(round(self.__process.memory_info()[1] // MEGA, 0))
+
+    def _probe_memory(self) -> tuple:
+        """Returns memory allocated for the process (as os_allocated_memory_mega)
+        and its resident set size in MB, read in a single probe."""
+        mem_info = self.__process.memory_info()
+        return int(round(mem_info[1] // MEGA, 0)), int(mem_info[0] // MEGA)
 
     def mem_array_allocated_memory_mega(self) -> int:
         """Returns memory allocated for the process in internal memory array in MB."""
@@ -127,7 +217,7 @@ class MemConsumer:
         ) * self.chunk_size_mega
         return int(mem_array_size_mega)
 
-    def change_allocation(self, alloc_size: int):
+    def change_allocation(self, alloc_size: int) -> StepTelemetry:
         """Changes current memory allocation to required value.
 
         It adds or removes to memory array chunks in the form of bytearray
@@ -140,22 +230,109 @@ class MemConsumer:
         alloc_size : int :
             Required memory allocation in the number of chunks.
             One chunk is 1% of maximal memory to be allocated.
+
+        Returns
+        -------
+        StepTelemetry
+            Resource usage of the process caused by the allocation change
+            (also available as last_telemetry).
+        """
+        telemetry = self._measured_resize(alloc_size)
+        sleep(self._settle_time_sec())
+        # gc.collect()
+        return telemetry
+
+    def _settle_time_sec(self) -> float:
+        """Returns time to wait after allocation change, shortened for short timeslots."""
+        return min(SLEEP_TIME_AFTER_ALLOCATION, self.wall_time_slot_sec() / 2)
+
+    def _measured_resize(self, alloc_size: int) -> StepTelemetry:
+        """Changes the memory array size (see _paced_resize) measuring resource usage."""
+        self.__telemetry_probe.start()
+        self._paced_resize(alloc_size)
+        self.last_telemetry = self.__telemetry_probe.stop()
+        return self.last_telemetry
+
+    def _paced_resize(self, alloc_size: int):
+        """Adds or removes memory chunks one by one according to the ramp shape and rates.
+
+        The change is spread over the timeslot without the settle time. The part
+        of the change not allowed by the rate limit is left for the next steps.
+        The rate limit is counted from the last chunk changed under it (or the first
+        rate limited change), so it holds on average across the steps.
+
+        Parameters
+        ----------
+        alloc_size : int :
+            Required memory allocation in the number of chunks.
         """
+        current = len(self.__memory_arr)
+        change = max(0, alloc_size - self.__correction) - current
+        rate = (
+            self.mc_params.alloc_rate_mega_sec
+            if change > 0
+            else self.mc_params.release_rate_mega_sec
+        )
+        if self.mc_params.ramp_shape == "step" and rate <= 0:
+            self._resize_memory_array(alloc_size)
+            return
+        direction = 1 if change > 0 else -1
+        start = monotonic()
+        rate_start = 0.0
+        if rate > 0:
+            rate_start = self.__rate_reference.setdefault(direction, start) - start
+        times = ramp_times(
+            abs(change),
+            self.chunk_size_mega,
+            (self.wall_time_slot_sec() - self._settle_time_sec()) * RAMP_WINDOW_FRACTION,
+            self.mc_params.ramp_shape,
+            rate,
+            rate_start,
+        )
+        for k, due in enumerate(times, start=1):
+            sleep(max(0.0, start + due - monotonic()))
+            self._set_chunks_number(current + direction * k)
+        if rate > 0 and times:
+            self.__rate_reference[direction] = start + times[-1]
+        self.backend.after_change()
+
+    def _resize_memory_array(self, alloc_size: int):
+        """Adds or removes memory chunks to achieve required allocation (see change_allocation).
+
+        Parameters
+        ----------
+        alloc_size : int :
+            Required memory allocation in the number of chunks.
+        """
+        self._set_chunks_number(max(0, alloc_size - self.__correction))
+        self.backend.after_change()
+
+    def _set_chunks_number(self, chunks_number: int):
+        """Adds or removes memory chunks, so the memory array has chunks_number chunks."""
         current_allocation = len(self.__memory_arr)
-        if current_allocation < (alloc_size - self.__correction):
-            for k in range(current_allocation, alloc_size - self.__correction):
+        if current_allocation < chunks_number:
+            for k in range(current_allocation, chunks_number):
                 if k == 0:
                     self.__memory_arr.append(
-                        bytearray(
+                        self.backend.allocate(
                             (self.chunk_size_mega - self.__correction_rest) * MEGA
                         )
                     )
                 else:
-                    self.__memory_arr.append(bytearray(self.chunk_size_mega * MEGA))
+                    self.__memory_arr.append(
+                        self.backend.allocate(self.chunk_size_mega * MEGA)
+                    )
         else:
-            del self.__memory_arr[max(0, alloc_size - self.__correction) :]
-        sleep(SLEEP_TIME_AFTER_ALLOCATION)
-        # gc.collect()
+            self._release_chunks(chunks_number)
+
+    def _release_chunks(self, keep: int):
+        """Removes from memory array and frees all chunks but the first keep ones."""
+        released = self.__memory_arr[keep:]
+        del self.__memory_arr[keep:]
+        if self.cold_memory is not None:
+            self.cold_memory.release(keep)
+        for chunk in released:
+            self.backend.release(chunk)
 
     def get_trend_multiplier(self, step: int) -> float:
         """
@@ -178,6 +355,31 @@ class MemConsumer:
         )
         return 1.0 + step * self.mc_params.linear_trend_slope / nb_of_steps_in_pattern
 
+    def percent_to_chunks(self, percent: int) -> int:
+        """Converts allocation in percent of max_ram_mega to the number of chunks.
+
+        The chunk size is fixed at start, so when max_ram_mega is changed at runtime
+        the number of chunks is scaled by its ratio to the initial max_ram_mega.
+        """
+        if self.mc_params.max_ram_mega == self.__initial_max_ram_mega:
+            return percent
+        return int(round(percent * self.mc_params.max_ram_mega / self.__initial_max_ram_mega))
+
+    def wall_time_slot_sec(self) -> float:
+        """Returns the timeslot in wall time seconds (time_slot_sec divided by speed_up)."""
+        return self.mc_params.time_slot_sec / self.mc_params.speed_up
+
+    def pattern_time(self) -> datetime:
+        """Returns the current time of the pattern.
+
+        Pattern time runs speed_up times faster than wall time since the process start
+        and is shifted to the pattern beginning if start_from_beginning is set.
+        """
+        now = datetime.now()
+        if self.mc_params.speed_up != 1.0:
+            now = self.__run_start + (now - self.__run_start) * self.mc_params.speed_up
+        return now - self.__time_shift
+
     def run_process(self):
         """Starts process of memory allocation.
 
@@ -185,50 +387,313 @@ class MemConsumer:
         """
         # step is used for computing trend multiplier for consecutive allocation events
         step = 0
-        steps_number = self.mc_params.duration_sec // self.mc_params.time_slot_sec
+        self.__run_start = datetime.now()
+        self.__steps_number = self.mc_params.duration_sec // self.mc_params.time_slot_sec
         # time_shift is computed to use RAM usage pattern from start
         # only if start_from_beginning flag is True
-        time_shift = timedelta(seconds=0)
-        if self.mc_params.start_from_beginning:
-            time_shift = self.mem_pattern.get_time_shift_from_start(
-                date_time=datetime.now()
-            )
+        self.__time_shift = self._pattern_time_shift()
+        if self.checkpoint is not None:
+            step = self._resume()
         try:
             while True:
-                alloc_size = self.mem_pattern.get_value(
-                    date_time=datetime.now() - time_shift
-                )
-                # if linear_trend_slope is defined - alloc_size is modified by trend multiplier
-                if self.mc_params.linear_trend_slope > 0.0:
-                    alloc_size = int(alloc_size * self.get_trend_multiplier(step))
-                self.change_allocation(alloc_size)
-                print(
-                    f'{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, '
-                    f"Allocated {alloc_size}% of {self.mc_params.max_ram_mega} MB, "
-                    f"(in memory array) {self.mem_array_allocated_memory_mega()} MB, "
-                    f"(in process) {self.os_allocated_memory_mega()} MB "
-                    f"for {self.mc_params.time_slot_sec} sec"
-                )
-                # when system does not deallocate memory as required, the memory array is cleared
-                # this is a king of reset
-                if (
-                    abs(
-                        self.os_allocated_memory_mega()
-                        - self.mem_array_allocated_memory_mega()
-                    )
-                    > RESET_OF_ALLOCATION_THRESHOLD * self.chunk_size_mega
-                ):
-                    del self.__memory_arr
-                    self.__memory_arr = []
-                    # gc.collect()
-
-                sleep(self.mc_params.time_slot_sec - SLEEP_TIME_AFTER_ALLOCATION)
-                # gc.collect()
-
+                self._apply_control(step)
+                self._run_step(step)
                 # finish work when steps_number reached
                 # infinite loop when steps_number < 0, default if duration_sec is not specified
-                if 0 < steps_number <= step:
+                if 0 < self.__steps_number <= step:
+                    self._remove_checkpoint()
                     return 0
                 step += 1
         except KeyboardInterrupt:
             return 0
+        finally:
+            self.run_log.close()
+            if self.__overruns:
+                print(
+                    f"MemConsumer: {self.__overruns} allocation steps did not fit "
+                    f"the timeslot of {self.wall_time_slot_sec():.3f}s "
+                    f"(maximal overrun {self.__max_overrun:.3f}s), "
+                    f"allocation cannot keep up with the timeslot "
+                    f"(speed-up {self.mc_params.speed_up})"
+                )
+            self._release_chunks(0)
+            self.backend.close()
+
+    def _run_step(self, step: int):
+        """Changes allocation to the current target, logs (and checkpoints) the step
+        and waits for the next one."""
+        wall_time_slot = self.wall_time_slot_sec()
+        step_start = monotonic()
+        alloc_size = self._target_percent(step)
+        paused = self.control is not None and self.control.paused
+        if paused:
+            self.last_telemetry = StepTelemetry(swap_mega=read_swap_mega())
+        else:
+            self._measured_resize(self.percent_to_chunks(alloc_size))
+        cold_stats = None
+        if self.cold_memory is not None:
+            cold_stats = self.cold_memory.step(self.__memory_arr, step)
+        # the settle time is shortened for timeslots compressed by speed_up
+        sleep(self._settle_time_sec())
+        record = self._step_record(step, alloc_size, self.last_telemetry)
+        if cold_stats is not None:
+            record.extra["cold"] = cold_stats
+        # when system does not deallocate memory as required, the memory array is cleared
+        # this is a king of reset
+        if (
+            self.backend.rss_tracks_chunks
+            and abs(record.process_mega - record.achieved_mega)
+            > RESET_OF_ALLOCATION_THRESHOLD * self.chunk_size_mega
+        ):
+            record.reset = True
+            self._release_chunks(0)
+            # gc.collect()
+        if self.control is not None:
+            record.extra["control"] = {
+                "paused": paused,
+                "forced_percent": self.control.forced_percent,
+            }
+            self.control.publish_status(self._status(record))
+        if self.mc_params.speed_up != 1.0:
+            record.extra["speed_up"] = self.mc_params.speed_up
+        # the next step starts when the timeslot is over
+        remaining = wall_time_slot - (monotonic() - step_start)
+        if remaining < 0:
+            self._report_overrun(record, -remaining)
+        self.run_log.write(record)
+        if self.checkpoint is not None and self.checkpoint.is_due(step):
+            self._save_checkpoint(record)
+
+        sleep(max(0.0, wall_time_slot - (monotonic() - step_start)))
+        # gc.collect()
+
+    def _resume(self) -> int:
+        """Restores the run state from the checkpoint and pre-faults the checkpointed allocation.
+
+        The step (so the trend), the noise random generator and the pattern time
+        are continued. The pattern time is shifted by the time passed since the checkpoint,
+        so it continues from the checkpointed position, in step with the trend.
+        The checkpointed allocation is made at once, without pacing. The run is started
+        from the beginning if the checkpoint cannot be read or was written for another
+        pattern file or maximal memory.
+
+        Returns
+        -------
+        int
+            Number of the step the run is continued from, 0 if there is no checkpoint.
+        """
+        try:
+            checkpoint = self.checkpoint.load()
+            if checkpoint is not None:
+                self._check_checkpoint(checkpoint)
+        except ValueError as err:
+            print(f"MemConsumer: run started from the beginning: {err}")
+            return 0
+        if checkpoint is None:
+            return 0
+        random.setstate(rng_state_from_json(checkpoint.rng_state))
+        downtime = timedelta(seconds=max(0.0, time() - checkpoint.saved_at))
+        self.__run_start = datetime.fromtimestamp(checkpoint.run_start) + downtime
+        self.__time_shift = timedelta(seconds=checkpoint.time_shift_sec) + downtime
+        start = monotonic()
+        self._resize_memory_array(int(round(checkpoint.achieved_mega / self.chunk_size_mega)))
+        print(
+            f"MemConsumer: resumed from checkpoint {self.checkpoint.file_name} "
+            f"at step {checkpoint.step + 1}, "
+            f"{self.mem_array_allocated_memory_mega()}MB pre-faulted "
+            f"in {monotonic() - start:.3f}s"
+        )
+        return checkpoint.step + 1
+
+    def _check_checkpoint(self, checkpoint: RunCheckpoint):
+        """Checks the checkpoint was written for the same pattern file and maximal memory.
+
+        Raises
+        ------
+        ValueError
+            If the pattern file or the maximal memory of the run are different.
+        """
+        if checkpoint.pattern_file != self.mem_pattern.pattern_file_name:
+            raise ValueError(
+                f"checkpoint {self.checkpoint.file_name} was written for "
+                f"pattern {checkpoint.pattern_file}"
+            )
+        if checkpoint.max_ram_mega != self.mc_params.max_ram_mega:
+            raise ValueError(
+                f"checkpoint {self.checkpoint.file_name} was written for "
+                f"maximum memory {checkpoint.max_ram_mega}MB"
+            )
+
+    def _remove_checkpoint(self):
+        """Removes the checkpoint of the finished run, so it is not resumed."""
+        if self.checkpoint is not None:
+            self.checkpoint.remove()
+
+    def _save_checkpoint(self, record: RunLogRecord):
+        """Writes the run state after the allocation step to the checkpoint."""
+        self.checkpoint.save(
+            RunCheckpoint(
+                step=record.step,
+                trend_multiplier=self.get_trend_multiplier(record.step),
+                target_percent=record.target_percent,
+                target_mega=record.target_mega,
+                achieved_mega=0 if record.reset else record.achieved_mega,
+                run_start=self.__run_start.timestamp(),
+                time_shift_sec=self.__time_shift.total_seconds(),
+                pattern_file=self.mem_pattern.pattern_file_name,
+                max_ram_mega=self.mc_params.max_ram_mega,
+            )
+        )
+
+    def _report_overrun(self, record: RunLogRecord, overrun: float):
+        """Marks the step which has not fit the timeslot in the record and statistics."""
+        record.extra["overrun_sec"] = round(overrun, 6)
+        self.__overruns += 1
+        self.__max_overrun = max(self.__max_overrun, overrun)
+
+    def _target_percent(self, step: int) -> int:
+        """Returns the allocation required in the step in percent of max_ram_mega."""
+        if self.control is not None and self.control.forced_percent is not None:
+            return self.control.forced_percent
+        alloc_size = self.mem_pattern.get_value(date_time=self.pattern_time())
+        # if linear_trend_slope is defined - alloc_size is modified by trend multiplier
+        if self.mc_params.linear_trend_slope > 0.0:
+            alloc_size = int(alloc_size * self.get_trend_multiplier(step))
+        return alloc_size
+
+    def _pattern_time_shift(self) -> timedelta:
+        """Returns time shift of the pattern, counted from the process start
+        when start_from_beginning is set."""
+        if self.mc_params.start_from_beginning:
+            return self.mem_pattern.get_time_shift_from_start(date_time=self.__run_start)
+        return timedelta(seconds=0)
+
+    def _pattern_file_signature(self) -> tuple:
+        """Returns modification time and size of the pattern file, None if it is missing."""
+        try:
+            stat = os.stat(self.mem_pattern.pattern_file_name)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _apply_control(self, step: int):
+        """Applies pending control requests and reloads the changed pattern file.
+
+        Parameters
+        ----------
+        step : int
+            Number of the allocation step about to start.
+        """
+        if self.control is None:
+            return
+        params, mem_pattern = self.control.take_pending()
+        if mem_pattern is None and self.control.watch_pattern:
+            mem_pattern = self._reload_pattern()
+        if mem_pattern is not None:
+            self._swap_pattern(mem_pattern)
+        if params:
+            self._update_params(params, step)
+
+    def _reload_pattern(self) -> MemPattern:
+        """Returns the pattern loaded again if its file has changed, None otherwise.
+
+        If the changed file cannot be loaded the current pattern is kept.
+        """
+        signature = self._pattern_file_signature()
+        if signature is None or signature == self.__pattern_signature:
+            return None
+        self.__pattern_signature = signature
+        try:
+            return load_complete_pattern(self.mem_pattern.pattern_file_name)
+        except ValueError as err:
+            print(f"MemConsumer: pattern not reloaded, the current one is kept: {err}")
+            return None
+
+    def _swap_pattern(self, mem_pattern: MemPattern):
+        """Replaces the pattern keeping the noise and the current allocation."""
+        mem_pattern.noise_percent = self.mem_pattern.noise_percent
+        self.mem_pattern = mem_pattern
+        self.__pattern_signature = self._pattern_file_signature()
+        self.__time_shift = self._pattern_time_shift()
+        print(f"MemConsumer: pattern changed: {mem_pattern}")
+
+    def _update_params(self, params: dict, step: int):
+        """Changes parameters of the running process.
+
+        Parameters
+        ----------
+        params : dict
+            New values of the parameters (see control.SETTABLE_PARAMS).
+        step : int
+            Number of the allocation step about to start.
+        """
+        for name, value in params.items():
+            if name == "noise_percent":
+                self.mem_pattern.noise_percent = value
+            else:
+                setattr(self.mc_params, name, value)
+        if "time_slot_sec" in params and self.mc_params.duration_sec > 0:
+            # the number of steps is recomputed for the rest of the execution time
+            elapsed = (datetime.now() - self.__run_start).total_seconds()
+            elapsed *= self.mc_params.speed_up
+            remaining = max(0.0, self.mc_params.duration_sec - elapsed)
+            self.__steps_number = max(1, step + int(remaining // self.mc_params.time_slot_sec))
+        print(f"MemConsumer: parameters changed: {params}")
+
+    def _status(self, record: RunLogRecord) -> dict:
+        """Returns the state of the process reported by the control status request."""
+        return {
+            "step": record.step,
+            "target_percent": record.target_percent,
+            "target_mega": record.target_mega,
+            "achieved_mega": record.achieved_mega,
+            "rss_mega": record.rss_mega,
+            "paused": self.control.paused,
+            "forced_percent": self.control.forced_percent,
+            "pattern_file": self.mem_pattern.pattern_file_name,
+            "noise_percent": self.mem_pattern.noise_percent,
+            "max_ram_mega": self.mc_params.max_ram_mega,
+            "time_slot_sec": self.mc_params.time_slot_sec,
+            "speed_up": self.mc_params.speed_up,
+            "linear_trend_slope": self.mc_params.linear_trend_slope,
+            "chunk_size_mega": self.chunk_size_mega,
+        }
+
+    def _step_record(
+        self, step: int, alloc_size: int, telemetry: StepTelemetry
+    ) -> RunLogRecord:
+        """Builds the run log record describing the state after the allocation step.
+
+        Parameters
+        ----------
+        step : int
+            Allocation step number.
+        alloc_size : int
+            Required memory allocation in percent of max_ram_mega.
+        telemetry : StepTelemetry
+            Resource usage of the process caused by the allocation change.
+
+        Returns
+        -------
+        RunLogRecord
+            Record of the allocation step.
+        """
+        process_mega, rss_mega = self._probe_memory()
+        extra = {"telemetry": telemetry.as_dict()}
+        backend_stats = self.backend.step_stats()
+        if backend_stats:
+            extra["backend"] = backend_stats
+        return RunLogRecord(
+            step=step,
+            mono_time=monotonic(),
+            wall_time=time(),
+            target_percent=alloc_size,
+            target_mega=alloc_size * self.mc_params.max_ram_mega // 100,
+            max_ram_mega=self.mc_params.max_ram_mega,
+            achieved_mega=self.mem_array_allocated_memory_mega(),
+            process_mega=process_mega,
+            rss_mega=rss_mega,
+            latency_sec=telemetry.wall_sec,
+            time_slot_sec=self.mc_params.time_slot_sec,
+            extra=extra,
+        )
@@ -5,6 +5,15 @@ import csv
 from datetime import datetime, timedelta
 import random
 
+# period of the pattern of each type in its smallest time units
+PATTERN_PERIODS = {
+    ("s",): 60,
+    ("m",): 60,
+    ("m", "s"): 60 * 60,
+    ("h", "m"): 24 * 60,
+    ("d", "h", "m"): 7 * 24 * 60,
+}
+
 
 class MemPattern:
     """Implements time-dependent pattern of memory consumption.
@@ -134,6 +143,17 @@ class MemPattern:
             return self.pattern_duration * 60
         return self.pattern_duration
 
+    def is_complete(self) -> bool:
+        """
+        Checks if the pattern contains values for its whole period
+        Returns
+        -------
+        bool:
+            True if the pattern type is known and values are defined for every
+            time slot of the period of the pattern
+        """
+        return self.pattern_duration == PATTERN_PERIODS.get(tuple(self.pattern_type))
+
     def get_time_shift_from_start(self, date_time: datetime = None) -> timedelta:
         """
         Returns time shift between date_time and starting datetime of RAM usage pattern
@@ -0,0 +1,236 @@
+"""
+Implements recording of memory usage of a process or a cgroup as a memory consumption pattern.
+"""
+import os
+from datetime import datetime
+from time import monotonic, sleep
+from memory_consumer.mem_pattern import PATTERN_PERIODS
+
+MEGA = 10**6
+# pattern types the recording can be folded into, with the columns of the pattern file
+PATTERN_TYPES = {
+    "s": ["s"],
+    "m": ["m"],
+    "ms": ["m", "s"],
+    "hm": ["h", "m"],
+    "dhm": ["d", "h", "m"],
+}
+# functions combining samples which fall into the same time slot of the pattern,
+# computed from running aggregates of the slot: [sum, count, max, last]
+AGGREGATES = {
+    "mean": lambda slot: slot[0] / slot[1],
+    "max": lambda slot: slot[2],
+    "last": lambda slot: slot[3],
+}
+# cgroup files with the memory usage of the cgroup (v2 and v1)
+CGROUP_USAGE_FILES = ("memory.current", "memory.usage_in_bytes")
+# size of the buffer the /proc and cgroup files are read to
+READ_SIZE = 256
+
+
+class RssSampler:
+    """Reads the resident memory of a process or the memory usage of a cgroup.
+
+    The file is opened once and read again from the beginning for every sample,
+    so a sample costs a single pread system call.
+
+    Parameters
+    ----------
+    pid : `int`, default=None
+        id of the process, its RSS is read from /proc/PID/statm
+    cgroup : `str`, default=None
+        directory of the cgroup (e.g. /sys/fs/cgroup/kubepods.slice/...),
+        memory.current (v2) or memory.usage_in_bytes (v1) is read
+    """
+
+    def __init__(self, pid: int = None, cgroup: str = None):
+        if (pid is None) == (cgroup is None):
+            raise ValueError("either pid or cgroup should be given")
+        self._scale = 1
+        if pid is not None:
+            path = f"/proc/{pid}/statm"
+            # RSS is the second field, in pages
+            self._field = 1
+            self._scale = os.sysconf("SC_PAGE_SIZE")
+        else:
+            path = next(
+                (
+                    os.path.join(cgroup, name)
+                    for name in CGROUP_USAGE_FILES
+                    if os.path.exists(os.path.join(cgroup, name))
+                ),
+                None,
+            )
+            if path is None:
+                raise ValueError(f"no memory usage file in cgroup {cgroup}")
+            self._field = 0
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def read_bytes(self) -> int:
+        """Returns the current memory usage in bytes.
+
+        Raises
+        ------
+        ProcessLookupError
+            If the process has finished (or the cgroup is removed).
+        """
+        try:
+            data = os.pread(self._fd, READ_SIZE, 0)
+        except OSError as err:
+            raise ProcessLookupError(f"{self.path} cannot be read: {err}") from err
+        value = int(data.split()[self._field]) * self._scale if data else 0
+        # a finished process (zombie) has no memory, a cgroup always has some
+        if value == 0:
+            raise ProcessLookupError(f"{self.path} reports no memory")
+        return value
+
+    def close(self):
+        """Closes the sampled file."""
+        os.close(self._fd)
+
+
+def record_samples(sampler: RssSampler, interval_sec: float, duration_sec: float = -1):
+    """Yields (datetime, bytes) samples read every interval_sec.
+
+    Samples are taken at fixed times (not drifting with the time of reading).
+    Recording finishes after duration_sec (never if negative) or when the sampled
+    process finishes.
+    """
+    start = monotonic()
+    sample = 0
+    while duration_sec < 0 or sample * interval_sec <= duration_sec:
+        sleep(max(0.0, start + sample * interval_sec - monotonic()))
+        try:
+            value = sampler.read_bytes()
+        except ProcessLookupError:
+            return
+        yield datetime.now(), value
+        sample += 1
+
+
+def pattern_key(d_t: datetime, pattern_type: str, resolution: int) -> tuple:
+    """Returns the key of the pattern time slot d_t falls into (as MemPattern keys)."""
+    smallest = {
+        "s": d_t.second,
+        "m": d_t.minute,
+        "ms": d_t.second,
+        "hm": d_t.minute,
+        "dhm": d_t.minute,
+    }[pattern_type] // resolution * resolution
+    return {
+        "s": (smallest,),
+        "m": (smallest,),
+        "ms": (d_t.minute, smallest),
+        "hm": (d_t.hour, smallest),
+        "dhm": (d_t.weekday(), d_t.hour, smallest),
+    }[pattern_type]
+
+
+def _period_keys(pattern_type: str, resolution: int) -> list:
+    """Returns keys of all time slots of the pattern period in time order."""
+    keys = []
+    for offset in range(0, PATTERN_PERIODS[tuple(PATTERN_TYPES[pattern_type])], resolution):
+        if pattern_type in ("s", "m"):
+            keys.append((offset,))
+        elif pattern_type in ("ms", "hm"):
+            keys.append((offset // 60, offset % 60))
+        else:
+            keys.append((offset // (24 * 60), offset // 60 % 24, offset % 60))
+    return keys
+
+
+class PatternBuilder:
+    """Folds memory usage samples into a periodic memory consumption pattern.
+
+    Samples are assigned to the time slots of the pattern period by their time
+    (so a recording longer than the period is folded) and combined within a slot
+    with the aggregate function. Values are percents of max_mega.
+
+    Parameters
+    ----------
+    pattern_type : `str`, default="ms"
+        type of the pattern, one of PATTERN_TYPES
+    resolution : `int`, default=1
+        length of the pattern time slot in its smallest units (seconds for s and ms,
+        minutes for m, hm and dhm), should divide 60 and be lower than 60
+        (MemPattern detects the resolution from the first two rows of the file)
+    max_mega : `float`, default=None
+        memory corresponding to 100%, if not given the maximal slot value is used
+    aggregate : `str`, default="mean"
+        function combining samples within a slot, one of AGGREGATES
+    """
+
+    def __init__(
+        self,
+        pattern_type: str = "ms",
+        resolution: int = 1,
+        max_mega: float = None,
+        aggregate: str = "mean",
+    ):
+        if pattern_type not in PATTERN_TYPES:
+            raise ValueError(f"pattern type should be one of {list(PATTERN_TYPES)}")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"aggregate should be one of {list(AGGREGATES)}")
+        if not 1 <= resolution < 60 or 60 % resolution != 0:
+            raise ValueError("resolution should divide 60 and be lower than 60")
+        self.pattern_type = pattern_type
+        self.resolution = resolution
+        self.max_mega = max_mega
+        self.aggregate = aggregate
+        self.samples = 0
+        # running aggregates of samples in MB by time slot, see AGGREGATES,
+        # so the memory does not grow with the recording length
+        self._slots = {}
+
+    def add(self, d_t: datetime, value_bytes: int):
+        """Adds the sample of memory usage taken at d_t."""
+        key = pattern_key(d_t, self.pattern_type, self.resolution)
+        mega = value_bytes / MEGA
+        slot = self._slots.get(key)
+        if slot is None:
+            self._slots[key] = [mega, 1, mega, mega]
+        else:
+            slot[0] += mega
+            slot[1] += 1
+            slot[2] = max(slot[2], mega)
+            slot[3] = mega
+        self.samples += 1
+
+    def values(self) -> dict:
+        """Returns pattern values (percents) for all time slots of the pattern period.
+
+        Slots without samples get the value of the previous slot with samples
+        (the period is treated as cyclic).
+
+        Raises
+        ------
+        ValueError
+            If no samples were added.
+        """
+        if not self._slots:
+            raise ValueError("no samples recorded")
+        megas = {key: AGGREGATES[self.aggregate](slot) for key, slot in self._slots.items()}
+        max_mega = self.max_mega if self.max_mega else max(megas.values())
+        keys = _period_keys(self.pattern_type, self.resolution)
+        # start from the last slot with samples, so the first slots are filled cyclically
+        last = next(megas[key] for key in reversed(keys) if key in megas)
+        values = {}
+        for key in keys:
+            last = megas.get(key, last)
+            values[key] = int(round(100 * last / max_mega)) if max_mega > 0 else 0
+        return values
+
+    def write(self, file_name: str):
+        """Writes the pattern as the csv file read by MemPattern.
+
+        The file is replaced atomically, so a memory consumer watching it
+        never reads a partially written pattern.
+        """
+        values = self.values()
+        tmp_file_name = f"{file_name}.tmp"
+        with open(tmp_file_name, mode="w", encoding="utf-8") as pattern_file:
+            pattern_file.write(",".join(PATTERN_TYPES[self.pattern_type] + ["mem"]) + "\n")
+            for key, value in values.items():
+                pattern_file.write(",".join(str(k) for k in key) + f",{value}\n")
+        os.replace(tmp_file_name, file_name)
@@ -0,0 +1,77 @@
+"""
+Implements schedules of paced allocation changes (ramps) within an allocation step.
+"""
+import math
+
+# shapes of the allocation change within the ramp window:
+# step - the whole change at once, linear - constant rate,
+# exponential - fast start slowing down towards the target
+RAMP_SHAPES = ("step", "linear", "exponential")
+# steepness of the exponential ramp, 1 - exp(-5) of the change is done at the window end
+EXPONENTIAL_RAMP_RATE = 5.0
+
+
+def _shape_time(fraction: float, ramp_shape: str) -> float:
+    """Returns time (as fraction of the window) the fraction of the change is reached at."""
+    if ramp_shape == "linear":
+        return fraction
+    if ramp_shape == "exponential":
+        scale = 1.0 - math.exp(-EXPONENTIAL_RAMP_RATE)
+        return -math.log(1.0 - fraction * scale) / EXPONENTIAL_RAMP_RATE
+    return 0.0
+
+
+# the rate limit and its start are passed with the ramp shape, so the ramp stays a pure function
+def ramp_times(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    chunks: int,
+    chunk_size_mega: float,
+    window_sec: float,
+    ramp_shape: str = "step",
+    rate_mega_sec: float = 0.0,
+    rate_start_sec: float = 0.0,
+) -> list:
+    """Returns times the consecutive chunks should be allocated (or released) at.
+
+    Chunk k (1..chunks) is due when the ramp shape reaches k/chunks of the change,
+    but not earlier than the rate limit allows: k chunk intervals (chunk size / rate)
+    after rate_start_sec. Chunks due after the window end are not included, so the change
+    limited by the rate is continued in the next step, with rate_start_sec set to
+    the time of its last chunk. rate_start_sec earlier than one chunk interval before
+    the ramp start is moved to it, so at most one chunk is due at once after an idle time.
+
+    Parameters
+    ----------
+    chunks : int
+        Number of chunks to be allocated or released.
+    chunk_size_mega : float
+        Chunk size in MB.
+    window_sec : float
+        Time in seconds the change should be spread over.
+    ramp_shape : str
+        One of RAMP_SHAPES.
+    rate_mega_sec : float
+        Maximal rate of the change in MB/s, 0 - not limited.
+    rate_start_sec : float
+        Time the rate limit is counted from, relative to the ramp start
+        (negative - before it), e.g. the time of the last chunk changed
+        under the rate limit.
+
+    Returns
+    -------
+    list
+        Offsets in seconds from the ramp start, one for every chunk to be changed
+        within the window.
+    """
+    if ramp_shape not in RAMP_SHAPES:
+        raise ValueError(f"unknown ramp shape {ramp_shape}, one of {RAMP_SHAPES} expected")
+    times = []
+    interval = chunk_size_mega / rate_mega_sec if rate_mega_sec > 0 else 0.0
+    rate_start_sec = max(rate_start_sec, -interval)
+    for k in range(1, chunks + 1):
+        due = _shape_time(k / chunks, ramp_shape) * window_sec
+        if rate_mega_sec > 0:
+            due = max(due, rate_start_sec + k * interval)
+        if due > window_sec:
+            break
+        times.append(due)
+    return times
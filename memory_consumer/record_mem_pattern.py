@@ -0,0 +1,112 @@
+"""
+Records memory usage of a process or a cgroup as a memory consumption pattern file.
+"""
+import argparse
+from time import monotonic
+from memory_consumer.pattern_recorder import (
+    AGGREGATES,
+    PATTERN_TYPES,
+    PatternBuilder,
+    RssSampler,
+    record_samples,
+)
+
+
+def main():
+    """starts Memory pattern recorder app"""
+    parser = argparse.ArgumentParser(description="Memory consumption pattern recorder")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("-p", "--pid", type=int, help="Id of the process RSS is recorded of.")
+    source.add_argument(
+        "-g",
+        "--cgroup",
+        type=str,
+        help="Directory of the cgroup memory usage is recorded of "
+        "(e.g. a pod cgroup in /sys/fs/cgroup).",
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, required=True, help="Pattern csv file to be written."
+    )
+    parser.add_argument(
+        "-i",
+        "--interval_sec",
+        type=float,
+        default=0.5,
+        help="Sampling interval in seconds (default: %(default)s).",
+    )
+    parser.add_argument(
+        "-d",
+        "--duration_sec",
+        type=float,
+        default=-1,
+        help="Recording time in seconds. Default=%(default)s - until the process "
+        "finishes or CTRL+C.",
+    )
+    parser.add_argument(
+        "-t",
+        "--pattern_type",
+        type=str,
+        choices=list(PATTERN_TYPES),
+        default="ms",
+        help="Type of the pattern the recording is folded into (default: %(default)s).",
+    )
+    parser.add_argument(
+        "-r",
+        "--resolution",
+        type=int,
+        default=1,
+        help="Time slot of the pattern in its smallest units, seconds for s and ms, "
+        "minutes for m, hm and dhm (default: %(default)s). Should divide 60 and be lower than 60.",
+    )
+    parser.add_argument(
+        "-m",
+        "--max_mega",
+        type=float,
+        default=None,
+        help="Memory in MB corresponding to 100%% of the pattern. "
+        "Default - the maximal recorded value.",
+    )
+    parser.add_argument(
+        "-a",
+        "--aggregate",
+        type=str,
+        choices=list(AGGREGATES),
+        default="mean",
+        help="Function combining samples in a time slot (default: %(default)s).",
+    )
+    parser.add_argument(
+        "-w",
+        "--write_every_sec",
+        type=float,
+        default=0,
+        help="The pattern file is also written every WRITE_EVERY_SEC seconds of recording, "
+        "so it can be followed by the memory consumer with --watch_pattern. "
+        "Default=%(default)s - written at the end only.",
+    )
+    args = parser.parse_args()
+
+    try:
+        builder = PatternBuilder(args.pattern_type, args.resolution, args.max_mega, args.aggregate)
+        sampler = RssSampler(args.pid, args.cgroup)
+    except (ValueError, OSError) as err:
+        parser.error(str(err))
+    print(f"Recording {sampler.path} every {args.interval_sec}s to {args.output}")
+    last_write = monotonic()
+    try:
+        for d_t, value in record_samples(sampler, args.interval_sec, args.duration_sec):
+            builder.add(d_t, value)
+            if 0 < args.write_every_sec <= monotonic() - last_write:
+                builder.write(args.output)
+                last_write = monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.close()
+    if builder.samples == 0:
+        parser.error("no samples recorded")
+    builder.write(args.output)
+    print(f"{builder.samples} samples written to {args.output} as {args.pattern_type}-pattern")
+
+
+if __name__ == "__main__":
+    main()
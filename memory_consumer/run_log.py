@@ -0,0 +1,271 @@
+"""
+Implements structured, buffered run log of consecutive memory allocation steps.
+"""
+import json
+import os
+import struct
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+# supported formats of the run log
+LOG_FORMATS = ("text", "jsonl", "binary")
+# binary run log starts with the magic bytes followed by the format version
+BINARY_MAGIC = b"MCRL"
+BINARY_VERSION = 1
+# fixed part of a binary record:
+# step, mono_time, wall_time, target_percent, target_mega, max_ram_mega,
+# achieved_mega, process_mega, rss_mega, latency_sec, time_slot_sec, reset,
+# length of json encoded extra fields
+BINARY_RECORD = struct.Struct("<Qddiqqqqqdd?I")
+
+
+# all fields of the step are kept flat, so they map to the fixed binary record
+@dataclass(init=True, repr=True)
+class RunLogRecord:  # pylint: disable=too-many-instance-attributes
+    """Stores the state of the memory consumer after one allocation step.
+
+    Arguments:
+
+    step : `int`
+        allocation step number
+    mono_time : `float`
+        monotonic timestamp of the step in seconds
+    wall_time : `float`
+        wall clock timestamp of the step (seconds since epoch)
+    target_percent : `int`
+        required memory allocation in percent of max_ram_mega
+    target_mega : `int`
+        required memory allocation in MB
+    max_ram_mega : `int`
+        memory allocated when the pattern value is 100
+    achieved_mega : `int`
+        memory allocated in the memory array in MB
+    process_mega : `int`
+        memory allocated for the process read from OS level in MB
+    rss_mega : `int`
+        resident set size of the process in MB
+    latency_sec : `float`
+        time spent in changing allocation in seconds
+    time_slot_sec : `float`
+        duration to the next allocation step in seconds
+    reset : `bool`, default=False
+        flag set if the memory array has been reset in this step
+    extra : `dict`, default={}
+        additional, mode dependent fields of the step
+    """
+
+    step: int
+    mono_time: float
+    wall_time: float
+    target_percent: int
+    target_mega: int
+    max_ram_mega: int
+    achieved_mega: int
+    process_mega: int
+    rss_mega: int
+    latency_sec: float
+    time_slot_sec: float
+    reset: bool = False
+    extra: dict = field(default_factory=dict)
+
+
+def render_text(record: RunLogRecord) -> str:
+    """Renders the record as a human-readable log line."""
+    wall_time = datetime.fromtimestamp(record.wall_time)
+    return (
+        f'{wall_time.strftime("%Y-%m-%d %H:%M:%S")}, '
+        f"Allocated {record.target_percent}% of {record.max_ram_mega} MB, "
+        f"(in memory array) {record.achieved_mega} MB, "
+        f"(in process) {record.process_mega} MB "
+        f"for {record.time_slot_sec} sec\n"
+    )
+
+
+def render_jsonl(record: RunLogRecord) -> str:
+    """Renders the record as a single JSON Lines entry."""
+    return json.dumps(asdict(record), separators=(",", ":")) + "\n"
+
+
+def render_binary(record: RunLogRecord) -> bytes:
+    """Renders the record as a compact binary entry.
+
+    The fixed fields are packed with BINARY_RECORD and followed by
+    the JSON encoded extra fields (empty when there are no extra fields).
+    """
+    extra = (
+        json.dumps(record.extra, separators=(",", ":")).encode("utf-8")
+        if record.extra
+        else b""
+    )
+    return (
+        BINARY_RECORD.pack(
+            record.step,
+            record.mono_time,
+            record.wall_time,
+            record.target_percent,
+            record.target_mega,
+            record.max_ram_mega,
+            record.achieved_mega,
+            record.process_mega,
+            record.rss_mega,
+            record.latency_sec,
+            record.time_slot_sec,
+            record.reset,
+            len(extra),
+        )
+        + extra
+    )
+
+
+def binary_header() -> bytes:
+    """Returns the header starting every binary run log file."""
+    return BINARY_MAGIC + struct.pack("<H", BINARY_VERSION)
+
+
+def read_binary_records(stream):
+    """Yields RunLogRecord objects read from binary run log stream.
+
+    Parameters
+    ----------
+    stream :
+        Binary stream (opened with "rb") positioned at the beginning of a run log.
+    """
+    header = stream.read(len(binary_header()))
+    if header[: len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("Not a binary run log of memory consumer")
+    while True:
+        fixed = stream.read(BINARY_RECORD.size)
+        if len(fixed) < BINARY_RECORD.size:
+            return
+        values = BINARY_RECORD.unpack(fixed)
+        extra_len = values[-1]
+        extra = json.loads(stream.read(extra_len)) if extra_len else {}
+        yield RunLogRecord(*values[:-1], extra=extra)
+
+
+RENDERERS = {"text": render_text, "jsonl": render_jsonl, "binary": render_binary}
+
+
+# the writer keeps its parameters and the state of buffer and file
+class RunLogWriter:  # pylint: disable=too-many-instance-attributes
+    """Implements buffered writer of the run log.
+
+    Records are rendered in the chosen format and kept in the buffer
+    until flush_every records are collected, then they are written to the file
+    (or stdout) in a single call. Optionally the log file is rotated when its size
+    exceeds max_bytes.
+
+    Parameters
+    ----------
+    log_format : `str`, default="text"
+        format of the log, one of LOG_FORMATS
+    file_name : `str`, default=None
+        log file name, if not provided the log is written to stdout
+        (not possible for the binary format, its header and records
+        would be mixed with other output)
+    flush_every : `int`, default=1
+        number of records buffered before they are written out
+    max_bytes : `int`, default=0
+        size of the log file causing its rotation, 0 means no rotation
+    backup_count : `int`, default=3
+        number of rotated log files kept (file_name.1, file_name.2, ...)
+
+    Raises
+    ------
+    ValueError
+        If the log format is unknown or the binary log has no file.
+    """
+
+    def __init__(
+        self,
+        log_format: str = "text",
+        file_name: str = None,
+        flush_every: int = 1,
+        max_bytes: int = 0,
+        backup_count: int = 3,
+    ):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"log_format should be one of {LOG_FORMATS}")
+        if log_format == "binary" and file_name is None:
+            raise ValueError("binary log should be written to a file")
+        self.log_format = log_format
+        self.file_name = file_name
+        self.flush_every = max(1, flush_every)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._render = RENDERERS[log_format]
+        self._buffer = []
+        self._file = None
+        self._file_size = 0
+
+    def __repr__(self):
+        return (
+            f"RunLogWriter: format={self.log_format}, "
+            f"file={self.file_name or 'stdout'}, flush every {self.flush_every} records, "
+            f"rotation at {self.max_bytes or 'no'} bytes"
+        )
+
+    def write(self, record: RunLogRecord):
+        """Buffers the record and flushes the buffer when it is full."""
+        self._buffer.append(self._render(record))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered records out."""
+        if not self._buffer:
+            return
+        data = (
+            b"".join(self._buffer)
+            if self.log_format == "binary"
+            else "".join(self._buffer)
+        )
+        self._buffer = []
+        if self.file_name is None:
+            self._write_stdout(data)
+        else:
+            self._write_file(data)
+
+    def close(self):
+        """Flushes the buffer and closes the log file."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_stdout(self, data):
+        # sys.stdout is looked up at write time, so redirected stdout is respected
+        sys.stdout.write(data)
+        sys.stdout.flush()
+
+    def _write_file(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self._file is None:
+            self._open()
+        elif 0 < self.max_bytes < self._file_size + len(data):
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._file_size += len(data)
+
+    def _open(self):
+        # pylint: disable=consider-using-with
+        self._file = open(self.file_name, mode="ab")
+        self._file_size = self._file.tell()
+        if self.log_format == "binary" and self._file_size == 0:
+            self._file.write(binary_header())
+            self._file_size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.file_name}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.file_name}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.file_name, f"{self.file_name}.1")
+        else:
+            os.remove(self.file_name)
+        self._open()
@@ -4,7 +4,296 @@ Creates and runs MemConsumer with arguments.
 import os
 from datetime import datetime
 import argparse
+from memory_consumer.checkpoint import CheckpointStore
+from memory_consumer.cold_memory import COLD_ADVICES, ColdMemory, ColdMemoryParams
+from memory_consumer.control import ConsumerControl, ControlServer
 from memory_consumer.mem_consumer import MemPattern, MemConsumerParams, MemConsumer
+from memory_consumer.mem_backends import (
+    OBJECT_KINDS,
+    SHM_KINDS,
+    SIZE_DISTRIBUTIONS,
+    MallocChurnBackend,
+    MallocChurnParams,
+    MemBackend,
+    ObjectGraphBackend,
+    ObjectGraphParams,
+    PageCacheBackend,
+    SharedMemoryBackend,
+    ShmBackend,
+)
+from memory_consumer.ramp import RAMP_SHAPES
+from memory_consumer.run_log import LOG_FORMATS, RunLogWriter
+
+BACKENDS = ("bytearray", "malloc", "objects", "pagecache", "shm", "sharedmem")
+
+
+def _add_backend_arguments(parser: argparse.ArgumentParser):
+    """adds arguments selecting and configuring the memory allocation backend"""
+    group = parser.add_argument_group("memory allocation backends")
+    group.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="bytearray",
+        help="The way memory is consumed (default: %(default)s). "
+        "bytearray - chunks of 1%% of maximal memory, "
+        "malloc - many small and medium native heap blocks churned by threads, "
+        "objects - graphs of python objects (dicts, lists, cycles), "
+        "pagecache - page cache of written and read files, "
+        "shm - memfd or /dev/shm segments, "
+        "sharedmem - multiprocessing.shared_memory blocks shared by processes.",
+    )
+    group.add_argument(
+        "--malloc_size_distribution",
+        type=str,
+        choices=SIZE_DISTRIBUTIONS,
+        default="lognormal",
+        help="Distribution of malloc block sizes (default: %(default)s).",
+    )
+    group.add_argument(
+        "--malloc_sizes",
+        type=int,
+        nargs=3,
+        default=[16, 2048, 256 * 1024],
+        metavar=("MIN", "MEAN", "MAX"),
+        help="Minimal, mean and maximal malloc block size in bytes "
+        "(default: %(default)s).",
+    )
+    group.add_argument(
+        "--malloc_lifetime_steps",
+        type=float,
+        default=0.0,
+        help="Mean lifetime of malloc blocks in allocation steps, blocks are freed and "
+        "allocated again when it is over. Default=%(default)s - no churn.",
+    )
+    group.add_argument(
+        "--malloc_threads",
+        type=int,
+        default=4,
+        help="Number of threads allocating malloc blocks (default: %(default)s).",
+    )
+    group.add_argument(
+        "--malloc_arena_max",
+        type=int,
+        default=0,
+        help="Maximal number of malloc arenas, as MALLOC_ARENA_MAX. "
+        "Default=%(default)s - libc default.",
+    )
+    group.add_argument(
+        "--malloc_trim",
+        action="store_true",
+        help="Call malloc_trim after malloc blocks are freed.",
+    )
+    group.add_argument(
+        "--object_kind",
+        type=str,
+        choices=OBJECT_KINDS,
+        default="cyclic",
+        help="Kind of python object graphs of the objects backend (default: %(default)s).",
+    )
+    group.add_argument(
+        "--gc_threshold",
+        type=int,
+        nargs=3,
+        default=None,
+        metavar=("T0", "T1", "T2"),
+        help="Garbage collector thresholds (gc.set_threshold) for the objects backend. "
+        "Default - python defaults.",
+    )
+    group.add_argument(
+        "--gc_freeze",
+        action="store_true",
+        help="Move objects allocated by the objects backend to the permanent generation "
+        "(gc.freeze) after every allocation step.",
+    )
+    group.add_argument(
+        "--pagecache_dir",
+        type=str,
+        default=None,
+        help="Directory of the files of the pagecache backend (should not be tmpfs). "
+        "Default - /var/tmp.",
+    )
+    group.add_argument(
+        "--pagecache_keep_hot",
+        action="store_true",
+        help="Read all files of the pagecache backend after every allocation step.",
+    )
+    group.add_argument(
+        "--shm_kind",
+        type=str,
+        choices=SHM_KINDS,
+        default="memfd",
+        help="Kind of segments of the shm backend (default: %(default)s).",
+    )
+    group.add_argument(
+        "--sharedmem_prefix",
+        type=str,
+        default="mem_consumer",
+        help="Name prefix of the blocks of the sharedmem backend, processes using "
+        "the same prefix share the blocks (default: %(default)s).",
+    )
+
+
+def _add_cold_memory_arguments(parser: argparse.ArgumentParser):
+    """adds arguments of marking a part of allocated memory as cold"""
+    group = parser.add_argument_group("cold memory")
+    group.add_argument(
+        "--cold_fraction",
+        type=float,
+        default=0.0,
+        help="Fraction of allocated memory (the oldest chunks) marked as cold with madvise. "
+        "Supported by bytearray, shm and sharedmem backends. Default=%(default)s - none.",
+    )
+    group.add_argument(
+        "--cold_advice",
+        type=str,
+        choices=list(COLD_ADVICES),
+        default="cold",
+        help="madvise advice (default: %(default)s). cold - MADV_COLD, pages are reclaimed "
+        "first under memory pressure, pageout - MADV_PAGEOUT, pages are reclaimed at once.",
+    )
+    group.add_argument(
+        "--cold_every_steps",
+        type=int,
+        default=1,
+        help="Memory is marked as cold every COLD_EVERY_STEPS allocation steps "
+        "(default: %(default)s).",
+    )
+    group.add_argument(
+        "--cold_refault_after_steps",
+        type=int,
+        default=0,
+        help="Cold memory is read again (faulted back in) after this number of steps. "
+        "Default=%(default)s - never.",
+    )
+
+
+def _add_checkpoint_arguments(parser: argparse.ArgumentParser):
+    """adds arguments of checkpointing the run state and resuming the run after restart"""
+    group = parser.add_argument_group("checkpoint and resume")
+    group.add_argument(
+        "--checkpoint_file",
+        type=str,
+        default=None,
+        help="File the run state (step, trend, noise generator state, allocation) is "
+        "written to. If the file exists at start, the run is resumed from it and "
+        "the checkpointed allocation is made at once. The file is removed when the run "
+        "finishes. Default - no checkpoint.",
+    )
+    group.add_argument(
+        "--checkpoint_every_steps",
+        type=int,
+        default=1,
+        help="The checkpoint is written every CHECKPOINT_EVERY_STEPS allocation steps "
+        "(default: %(default)s).",
+    )
+
+
+def _create_cold_memory(
+    parser: argparse.ArgumentParser, args: argparse.Namespace, backend: MemBackend
+) -> ColdMemory:
+    """creates cold memory marking selected in arguments, None if not selected"""
+    if args.cold_fraction <= 0:
+        return None
+    try:
+        return ColdMemory(
+            ColdMemoryParams(
+                args.cold_fraction,
+                args.cold_advice,
+                args.cold_every_steps,
+                args.cold_refault_after_steps,
+            ),
+            backend,
+        )
+    except ValueError as err:
+        parser.error(str(err))
+    return None
+
+
+def _create_checkpoint(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> CheckpointStore:
+    """creates the checkpoint store selected in arguments, None if not selected"""
+    if args.checkpoint_file is None:
+        return None
+    try:
+        return CheckpointStore(args.checkpoint_file, args.checkpoint_every_steps)
+    except ValueError as err:
+        parser.error(f"--checkpoint_every_steps: {err}")
+    return None
+
+
+def _create_control(parser: argparse.ArgumentParser, args: argparse.Namespace) -> tuple:
+    """creates runtime control and starts its server as selected in arguments,
+    returns (control, server), None if not selected"""
+    control, control_server = None, None
+    if args.control_socket is not None or args.watch_pattern:
+        control = ConsumerControl(watch_pattern=args.watch_pattern)
+    if args.control_socket is not None:
+        try:
+            control_server = ControlServer(args.control_socket, control)
+        except ValueError as err:
+            parser.error(f"--control_socket: {err}")
+        control_server.start()
+    return control, control_server
+
+
+def _create_run_log(parser: argparse.ArgumentParser, args: argparse.Namespace) -> RunLogWriter:
+    """creates the run log writer configured in arguments"""
+    try:
+        return RunLogWriter(
+            log_format=args.log_format,
+            file_name=args.log_file,
+            flush_every=args.log_flush_every,
+            max_bytes=args.log_max_bytes,
+        )
+    except ValueError as err:
+        parser.error(f"--log_format {args.log_format}: {err} (--log_file)")
+    return None
+
+
+def _create_malloc_backend(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> MallocChurnBackend:
+    """creates the malloc backend configured in arguments"""
+    try:
+        return MallocChurnBackend(
+            MallocChurnParams(
+                size_distribution=args.malloc_size_distribution,
+                min_size=args.malloc_sizes[0],
+                mean_size=args.malloc_sizes[1],
+                max_size=args.malloc_sizes[2],
+                lifetime_steps=args.malloc_lifetime_steps,
+                threads=args.malloc_threads,
+                arena_max=args.malloc_arena_max,
+                trim=args.malloc_trim,
+            )
+        )
+    except (ValueError, OSError) as err:
+        parser.error(f"malloc backend: {err}")
+    return None
+
+
+def _create_backend(parser: argparse.ArgumentParser, args: argparse.Namespace) -> MemBackend:
+    """creates the memory allocation backend selected in arguments"""
+    backend = MemBackend()
+    if args.backend == "malloc":
+        backend = _create_malloc_backend(parser, args)
+    elif args.backend == "objects":
+        backend = ObjectGraphBackend(
+            ObjectGraphParams(
+                object_kind=args.object_kind,
+                gc_threshold=args.gc_threshold,
+                gc_freeze=args.gc_freeze,
+            )
+        )
+    elif args.backend == "pagecache":
+        backend = PageCacheBackend(args.pagecache_dir, args.pagecache_keep_hot)
+    elif args.backend == "shm":
+        backend = ShmBackend(args.shm_kind)
+    elif args.backend == "sharedmem":
+        backend = SharedMemoryBackend(args.sharedmem_prefix)
+    return backend
 
 
 def main():
@@ -69,6 +358,80 @@ def main():
         help="Execution time of the memory consumer app in seconds. "
         "Default=%(default)s - which means app is working continuously until CTRL+C.",
     )
+    parser.add_argument(
+        "-x",
+        "--speed_up",
+        type=float,
+        default=1.0,
+        help="Play the memory consumption pattern SPEED_UP times faster than wall time, "
+        "e.g. 168 plays a week long pattern in one hour. The timeslot, duration and "
+        "linear trend are expressed in the pattern time. Default=%(default)s.",
+    )
+    parser.add_argument(
+        "--ramp_shape",
+        type=str,
+        choices=RAMP_SHAPES,
+        default="step",
+        help="Shape of the allocation change within the timeslot (default: %(default)s). "
+        "step - the whole change at the timeslot start, linear - constant rate, "
+        "exponential - fast start slowing down towards the target.",
+    )
+    parser.add_argument(
+        "--alloc_rate_mega_sec",
+        type=float,
+        default=0.0,
+        help="Maximal allocation rate in MB/s (wall time), the rest of the change is "
+        "continued in the next timeslots. Default=%(default)s - not limited.",
+    )
+    parser.add_argument(
+        "--release_rate_mega_sec",
+        type=float,
+        default=0.0,
+        help="Maximal release rate in MB/s (wall time). Default=%(default)s - not limited.",
+    )
+    parser.add_argument(
+        "--log_format",
+        type=str,
+        choices=LOG_FORMATS,
+        default="text",
+        help="Format of the allocation steps log (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--log_file",
+        type=str,
+        default=None,
+        help="File the allocation steps log is written to. Default - stdout.",
+    )
+    parser.add_argument(
+        "--log_flush_every",
+        type=int,
+        default=1,
+        help="Number of allocation steps buffered before the log is written out "
+        "(default: %(default)s).",
+    )
+    parser.add_argument(
+        "--log_max_bytes",
+        type=int,
+        default=0,
+        help="Size of the log file in bytes at which the file is rotated. "
+        "Default=%(default)s - no rotation.",
+    )
+    parser.add_argument(
+        "--control_socket",
+        type=str,
+        default=None,
+        help="Unix socket the app accepts control requests on (parameter changes, "
+        "pause/resume, forced target, pattern swap), see control_mem_consumer.py. "
+        "Default - no control.",
+    )
+    parser.add_argument(
+        "--watch_pattern",
+        action="store_true",
+        help="Reload the pattern file when it changes, keeping the current allocation.",
+    )
+    _add_backend_arguments(parser)
+    _add_cold_memory_arguments(parser)
+    _add_checkpoint_arguments(parser)
     args = parser.parse_args()
 
     ram_profile = MemPattern(args.pattern_file, args.noise_percent)
@@ -81,20 +444,51 @@ def main():
               f"has been overwritten by variable MAX_RAM_MEGA={max_ram_mega}")
     if max_ram_mega < 100:
         parser.error("-m, --max_ram_mega argument >= 100")
+    if args.speed_up <= 0:
+        parser.error("-x, --speed_up argument > 0")
     ram_consumer_params = MemConsumerParams(
         max_ram_mega,
         args.time_slot_sec,
         args.slope_linear_trend,
         args.start_from_beginning,
         args.duration_sec,
+        args.speed_up,
+        args.ramp_shape,
+        args.alloc_rate_mega_sec,
+        args.release_rate_mega_sec,
     )
 
-    ram_consumer = MemConsumer(ram_profile, ram_consumer_params)
+    run_log = _create_run_log(parser, args)
+
+    backend = _create_backend(parser, args)
+
+    cold_memory = _create_cold_memory(parser, args, backend)
+    checkpoint = _create_checkpoint(parser, args)
+
+    control, control_server = _create_control(parser, args)
+
+    ram_consumer = MemConsumer(
+        ram_profile,
+        ram_consumer_params,
+        run_log,
+        backend,
+        control=control,
+        cold_memory=cold_memory,
+        checkpoint=checkpoint,
+    )
     print(ram_profile)
     print(ram_consumer)
+    if cold_memory is not None:
+        print(cold_memory)
+    if checkpoint is not None:
+        print(checkpoint)
     print(f'Start time: {datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")}')
 
-    ram_consumer.run_process()
+    try:
+        ram_consumer.run_process()
+    finally:
+        if control_server is not None:
+            control_server.stop()
 
 
 if __name__ == "__main__":
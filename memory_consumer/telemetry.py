@@ -0,0 +1,97 @@
+"""
+Implements measurements of the process resource usage caused by allocation steps.
+"""
+import resource
+from dataclasses import asdict, dataclass
+from time import perf_counter
+
+# file the swap usage of the process is read from
+PROC_STATUS_FILE = "/proc/self/status"
+
+
+def read_swap_mega(status_file: str = PROC_STATUS_FILE) -> float:
+    """Returns memory of the process swapped out (VmSwap) in MB, nan if not available."""
+    try:
+        with open(status_file, mode="r", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmSwap:"):
+                    # the value is given in kB
+                    return int(line.split()[1]) * 1024 / 10**6
+    except OSError:
+        pass
+    return float("nan")
+
+
+# one field per getrusage counter reported for the step
+@dataclass(init=True, repr=True)
+class StepTelemetry:  # pylint: disable=too-many-instance-attributes
+    """Stores resource usage of the process measured for an allocation step.
+
+    Arguments:
+
+    wall_sec : `float`
+        wall time spent in changing allocation in seconds
+    cpu_user_sec : `float`
+        user CPU time of the process spent in changing allocation in seconds
+    cpu_system_sec : `float`
+        system CPU time of the process spent in changing allocation in seconds
+    minor_faults : `int`
+        page faults served without I/O
+    major_faults : `int`
+        page faults requiring I/O (e.g. swap in)
+    voluntary_ctx_switches : `int`
+        context switches caused by waiting for a resource
+    involuntary_ctx_switches : `int`
+        context switches forced by the scheduler
+    swap_mega : `float`
+        memory of the process swapped out after the step in MB
+    """
+
+    wall_sec: float = 0.0
+    cpu_user_sec: float = 0.0
+    cpu_system_sec: float = 0.0
+    minor_faults: int = 0
+    major_faults: int = 0
+    voluntary_ctx_switches: int = 0
+    involuntary_ctx_switches: int = 0
+    swap_mega: float = 0.0
+
+    def as_dict(self) -> dict:
+        """Returns the telemetry as dictionary with times and swap rounded."""
+        return {
+            key: round(value, 6) if isinstance(value, float) else value
+            for key, value in asdict(self).items()
+        }
+
+
+class TelemetryProbe:
+    """Measures resource usage of the process between start and stop.
+
+    Usage is read with getrusage (RUSAGE_SELF), so it includes all threads
+    of the process, e.g. threads of the malloc backend.
+    """
+
+    def __init__(self):
+        self._usage = None
+        self._start = None
+
+    def start(self):
+        """Takes the snapshot of resource usage the next measurement is relative to."""
+        self._usage = resource.getrusage(resource.RUSAGE_SELF)
+        self._start = perf_counter()
+
+    def stop(self) -> StepTelemetry:
+        """Returns resource usage since start."""
+        wall_sec = perf_counter() - self._start
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        before = self._usage
+        return StepTelemetry(
+            wall_sec=wall_sec,
+            cpu_user_sec=usage.ru_utime - before.ru_utime,
+            cpu_system_sec=usage.ru_stime - before.ru_stime,
+            minor_faults=usage.ru_minflt - before.ru_minflt,
+            major_faults=usage.ru_majflt - before.ru_majflt,
+            voluntary_ctx_switches=usage.ru_nvcsw - before.ru_nvcsw,
+            involuntary_ctx_switches=usage.ru_nivcsw - before.ru_nivcsw,
+            swap_mega=read_swap_mega(),
+        )
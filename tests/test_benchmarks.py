@@ -0,0 +1,61 @@
+"""Tests for the benchmark suite helpers"""
+import psutil
+from benchmarks import mem_benchmarks
+from benchmarks.mem_benchmarks import bench_get_value, bench_rss_drop, compare_with_baseline
+from memory_consumer.mem_backends import MEGA, MemBackend
+
+
+def __results(**values):
+    return {
+        "results": {
+            name: {"value": value, "unit": "", "higher_is_better": name.endswith("rate")}
+            for name, value in values.items()
+        }
+    }
+
+
+def test_compare_with_baseline():
+    """tests regressions are detected for both lower and higher is better results"""
+    baseline = __results(latency=10.0, rate=100.0, other=1.0)
+    results = __results(latency=12.0, rate=60.0, new=5.0)
+    comparison = {row[0]: row for row in compare_with_baseline(results, baseline, 0.3)}
+    assert set(comparison) == {"latency", "rate"}
+    assert comparison["latency"][3] == -0.2
+    assert not comparison["latency"][4]
+    assert comparison["rate"][3] == -0.4
+    assert comparison["rate"][4]
+
+
+def test_bench_get_value_covers_all_pattern_types():
+    """tests get_value benchmark reports positive lookup rate for every pattern type"""
+    results = bench_get_value(lookups=100)
+    assert {name.split(".")[1] for name in results} == {"s", "m", "ms", "dhm"}
+    assert all(result["value"] > 0 for result in results.values())
+
+
+def test_timed_out_result_is_regression():
+    """tests a timed out measurement is a regression even if the baseline timed out too"""
+    baseline = __results(latency=5000.0)
+    baseline["results"]["latency"]["timed_out"] = True
+    results = __results(latency=5000.0)
+    results["results"]["latency"]["timed_out"] = True
+    assert compare_with_baseline(results, baseline, 0.3)[0][4]
+
+
+class _GrowingProcess(psutil.Process):
+    """process of which RSS never drops"""
+
+    rss = 0
+
+    def memory_info(self):
+        """returns memory info with RSS growing with every probe"""
+        _GrowingProcess.rss += 100 * MEGA
+        return super().memory_info()._replace(rss=_GrowingProcess.rss)
+
+
+def test_bench_rss_drop_timeout(monkeypatch):
+    """tests RSS drop not observed within the timeout is marked as timed out"""
+    monkeypatch.setattr(mem_benchmarks.psutil, "Process", _GrowingProcess)
+    monkeypatch.setattr(mem_benchmarks, "BACKENDS", {"bytearray": MemBackend})
+    results = bench_rss_drop(chunk_size_mega=1, timeout=0.05)
+    assert results["rss_drop.bytearray.40MB"]["timed_out"]
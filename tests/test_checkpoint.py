@@ -0,0 +1,158 @@
+"""Tests for checkpoints and resume of MemConsumer runs"""
+import json
+import random
+from datetime import datetime
+import pytest
+from memory_consumer.checkpoint import CheckpointStore, RunCheckpoint, rng_state_from_json
+from memory_consumer.mem_consumer import MemConsumer, MemPattern, MemConsumerParams
+from memory_consumer.run_log import RunLogWriter
+
+
+def _checkpoint(step: int = 4, achieved_mega: int = 300) -> RunCheckpoint:
+    return RunCheckpoint(
+        step=step,
+        trend_multiplier=1.0,
+        target_percent=30,
+        target_mega=300,
+        achieved_mega=achieved_mega,
+        run_start=datetime.now().timestamp(),
+        time_shift_sec=0.0,
+        pattern_file="tests/patterns/s.csv",
+        max_ram_mega=1000,
+    )
+
+
+def _rewrite(file_name, **values):
+    """changes values of the written checkpoint file"""
+    data = json.loads(file_name.read_text(encoding="utf-8"))
+    data.update(values)
+    file_name.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_checkpoint_store(tmp_path):
+    """tests the checkpoint with the random generator state is written and read back"""
+    store = CheckpointStore(str(tmp_path / "run.json"), every_steps=3)
+    assert store.load() is None
+    assert [store.is_due(step) for step in range(6)] == [False, False, True] * 2
+    state = random.Random(7).getstate()
+    store.save(_checkpoint(), rng_state=state)
+    loaded = store.load()
+    assert loaded.step == 4 and loaded.achieved_mega == 300 and loaded.saved_at > 0
+    generator = random.Random()
+    generator.setstate(rng_state_from_json(loaded.rng_state))
+    assert generator.random() == random.Random(7).random()
+    assert not (tmp_path / "run.json.tmp").exists()
+    store.remove()
+    store.remove()
+    assert store.load() is None
+    with pytest.raises(ValueError):
+        CheckpointStore(str(tmp_path / "run.json"), every_steps=0)
+
+
+def test_wrong_checkpoint(tmp_path):
+    """tests a corrupted or unknown checkpoint is rejected"""
+    file_name = tmp_path / "run.json"
+    store = CheckpointStore(str(file_name))
+    file_name.write_text('{"step": 3', encoding="utf-8")
+    with pytest.raises(ValueError):
+        store.load()
+    file_name.write_text(json.dumps({"version": 1, "step": 3}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        store.load()
+    file_name.write_text(json.dumps({"version": 99}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        store.load()
+    store.save(_checkpoint())
+    _rewrite(file_name, rng_state=[])
+    with pytest.raises(ValueError):
+        store.load()
+    store.save(_checkpoint())
+    _rewrite(file_name, run_start="yesterday")
+    with pytest.raises(ValueError):
+        store.load()
+
+
+def test_resume_restores_state(tmp_path):
+    """tests resume continues the step and the noise and pre-faults the allocation"""
+    # pylint: disable=protected-access
+    store = CheckpointStore(str(tmp_path / "run.json"))
+    store.save(_checkpoint(step=9, achieved_mega=400), rng_state=random.Random(3).getstate())
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=1000),
+        checkpoint=store,
+    )
+    assert mem_consumer._resume() == 10
+    assert random.random() == random.Random(3).random()
+    assert mem_consumer.mem_array_allocated_memory_mega() == 400
+    mem_consumer.change_allocation(0)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [{"rng_state": []}, {"pattern_file": "tests/patterns/ms.csv"}, {"max_ram_mega": 2000}],
+)
+def test_resume_from_other_run(tmp_path, capsys, values):
+    """tests the run is started from the beginning when the checkpoint is wrong
+    or was written for another pattern or maximal memory"""
+    # pylint: disable=protected-access
+    file_name = tmp_path / "run.json"
+    store = CheckpointStore(str(file_name))
+    store.save(_checkpoint(step=9))
+    _rewrite(file_name, **values)
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=1000),
+        checkpoint=store,
+    )
+    assert mem_consumer._resume() == 0
+    assert "run started from the beginning" in capsys.readouterr().out
+    assert mem_consumer.mem_array_allocated_memory_mega() < 300
+
+
+def test_resume_skips_downtime(tmp_path):
+    """tests the pattern time continues from the checkpoint, not from the restart time"""
+    # pylint: disable=protected-access
+    file_name = tmp_path / "run.json"
+    store = CheckpointStore(str(file_name))
+    now = datetime.now().timestamp()
+    store.save(_checkpoint(achieved_mega=0))
+    # the checkpoint was written 40s after the run start and 60s ago
+    _rewrite(file_name, run_start=now - 100, saved_at=now - 60)
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=1000, speed_up=168),
+        checkpoint=store,
+    )
+    assert mem_consumer._resume() == 5
+    expected = now - 100 + 40 * 168
+    assert abs(mem_consumer.pattern_time().timestamp() - expected) < 5
+
+
+def test_run_process_checkpoint_and_resume(tmp_path, capsys):
+    """tests the step is checkpointed, the run is resumed from the checkpoint
+    and the checkpoint of the finished run is removed"""
+    # pylint: disable=protected-access
+    store = CheckpointStore(str(tmp_path / "run.json"))
+    params = MemConsumerParams(
+        max_ram_mega=1000, time_slot_sec=1, duration_sec=6, speed_up=10
+    )
+    mem_consumer = MemConsumer(MemPattern("tests/patterns/s.csv"), params, checkpoint=store)
+    mem_consumer._run_step(0)
+    assert store.load().step == 0
+    assert store.load().achieved_mega == mem_consumer.mem_array_allocated_memory_mega()
+    mem_consumer.change_allocation(0)
+
+    store.save(_checkpoint(step=4))
+    log_file = tmp_path / "run.jsonl"
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        params,
+        RunLogWriter("jsonl", str(log_file)),
+        checkpoint=store,
+    )
+    mem_consumer.run_process()
+    assert "resumed from checkpoint" in capsys.readouterr().out
+    with open(log_file, mode="r", encoding="utf-8") as log:
+        assert [json.loads(line)["step"] for line in log] == [5, 6]
+    assert store.load() is None
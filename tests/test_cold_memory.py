@@ -0,0 +1,102 @@
+"""Tests for marking allocated memory as cold"""
+import json
+import pytest
+from memory_consumer.cold_memory import ColdMemory, ColdMemoryParams
+from memory_consumer.mem_backends import MallocChurnBackend, MemBackend, ShmBackend
+from memory_consumer.mem_consumer import MemConsumer, MemPattern, MemConsumerParams
+from memory_consumer.run_log import RunLogWriter
+
+MEGA = 10**6
+
+
+def test_cold_chunks_are_advised_and_refaulted():
+    """tests the oldest chunks are marked as cold and read again after the set steps"""
+    backend = MemBackend()
+    cold_memory = ColdMemory(
+        ColdMemoryParams(fraction=0.5, advice="pageout", refault_after_steps=2), backend
+    )
+    chunks = [backend.allocate(4 * MEGA) for _ in range(4)]
+    stats = cold_memory.step(chunks, 0)
+    assert stats["advise_mega"] == pytest.approx(8, abs=0.1)
+    assert stats["cold_mega"] == 8
+    assert cold_memory.step(chunks, 1) == {"cold_mega": 8}
+    stats = cold_memory.step(chunks, 2)
+    assert stats["refault_mega"] == 8
+    assert "advise_mega" not in stats and stats["cold_mega"] == 0
+    assert cold_memory.step(chunks, 3)["advise_mega"] == pytest.approx(8, abs=0.1)
+    # released (the newest) chunks are forgotten, the remaining ones are still cold
+    stats = cold_memory.step(chunks[:2], 4)
+    assert stats["cold_mega"] == 8 and "advise_mega" not in stats
+
+
+def test_released_chunks_are_forgotten():
+    """tests chunks allocated after the memory array was released are not taken as cold,
+    even if they got addresses (ids) of the released ones"""
+    backend = MemBackend()
+    cold_memory = ColdMemory(ColdMemoryParams(fraction=0.5), backend)
+    chunks = [backend.allocate(4 * MEGA) for _ in range(4)]
+    assert cold_memory.step(chunks, 0)["cold_mega"] == 8
+    cold_memory.release(0)
+    chunks = [backend.allocate(4 * MEGA) for _ in range(4)]
+    stats = cold_memory.step(chunks, 1)
+    assert stats["cold_mega"] == 8 and stats["advise_mega"] == pytest.approx(8, abs=0.1)
+
+
+def test_cold_memory_schedule():
+    """tests chunks are marked as cold only every set number of steps"""
+    backend = ShmBackend()
+    cold_memory = ColdMemory(ColdMemoryParams(fraction=1.0, every_steps=3), backend)
+    chunks = [backend.allocate(MEGA)]
+    assert cold_memory.step(chunks, 1) == {"cold_mega": 0}
+    assert cold_memory.step(chunks, 3)["cold_mega"] == 1
+    backend.close()
+
+
+def test_cold_memory_validation():
+    """tests wrong parameters and backends without buffer chunks are rejected"""
+    with pytest.raises(ValueError):
+        ColdMemory(ColdMemoryParams(fraction=0.5, advice="dontneed"), MemBackend())
+    with pytest.raises(ValueError):
+        ColdMemory(ColdMemoryParams(fraction=1.5), MemBackend())
+    backend = MallocChurnBackend()
+    with pytest.raises(ValueError):
+        ColdMemory(ColdMemoryParams(fraction=0.5), backend)
+    backend.close()
+
+
+def test_run_process_with_cold_memory(tmp_path):
+    """tests cold memory statistics are logged"""
+    log_file = tmp_path / "run.jsonl"
+    backend = MemBackend()
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=200, time_slot_sec=1, duration_sec=1),
+        RunLogWriter("jsonl", str(log_file)),
+        backend,
+        cold_memory=ColdMemory(ColdMemoryParams(fraction=1.0), backend),
+    )
+    mem_consumer.run_process()
+    with open(log_file, mode="r", encoding="utf-8") as log:
+        records = [json.loads(line) for line in log]
+    assert all("cold_mega" in r["extra"]["cold"] for r in records)
+
+
+def test_reset_forgets_cold_chunks():
+    """tests chunks allocated again after the memory array reset are marked as cold again"""
+    # pylint: disable=protected-access
+    backend = MemBackend()
+    cold_memory = ColdMemory(ColdMemoryParams(fraction=1.0), backend)
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=400),
+        backend=backend,
+        cold_memory=cold_memory,
+    )
+    mem_consumer._resize_memory_array(50)
+    assert cold_memory.step(mem_consumer._MemConsumer__memory_arr, 0)["cold_mega"] > 0
+    mem_consumer._release_chunks(0)
+    mem_consumer._resize_memory_array(50)
+    stats = cold_memory.step(mem_consumer._MemConsumer__memory_arr, 1)
+    assert stats["advise_mega"] == pytest.approx(stats["cold_mega"], abs=0.2)
+    assert stats["cold_mega"] > 0
+    mem_consumer._release_chunks(0)
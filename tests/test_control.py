@@ -0,0 +1,126 @@
+"""Tests for runtime control of MemConsumer"""
+import json
+import pytest
+from memory_consumer.control import (
+    ConsumerControl,
+    ControlServer,
+    load_complete_pattern,
+    send_request,
+)
+from memory_consumer.mem_consumer import MemConsumer, MemPattern, MemConsumerParams
+from memory_consumer.run_log import RunLogWriter
+
+
+def _write_s_pattern(file_name, value: int, rows: int = 60):
+    with open(file_name, mode="w", encoding="utf-8") as out:
+        out.write("s,mem\n")
+        for second in range(rows):
+            out.write(f"{second},{value}\n")
+
+
+def test_control_requests():
+    """tests requests are validated and stored until taken"""
+    control = ConsumerControl()
+    assert not control.handle({"cmd": "jump"})["ok"]
+    assert control.handle({"cmd": "pause"})["ok"] and control.paused
+    assert control.handle({"cmd": "resume"})["ok"] and not control.paused
+    assert control.handle({"cmd": "force", "percent": 40})["ok"]
+    assert control.forced_percent == 40
+    assert control.handle({"cmd": "force", "percent": None})["ok"]
+    assert control.forced_percent is None
+    assert not control.handle({"cmd": "set", "duration_sec": 10})["ok"]
+    assert not control.handle({"cmd": "set", "max_ram_mega": 10})["ok"]
+    assert control.handle({"cmd": "set", "max_ram_mega": "200", "noise_percent": 5})["ok"]
+    assert control.take_pending() == ({"max_ram_mega": 200, "noise_percent": 5}, None)
+    assert control.take_pending() == ({}, None)
+
+
+def test_incomplete_pattern_is_rejected(tmp_path):
+    """tests a pattern not covering its period is not accepted"""
+    file_name = tmp_path / "half.csv"
+    _write_s_pattern(file_name, 50, rows=30)
+    with pytest.raises(ValueError):
+        load_complete_pattern(str(file_name))
+    control = ConsumerControl()
+    assert not control.handle({"cmd": "pattern", "file": str(file_name)})["ok"]
+    assert not control.handle({"cmd": "pattern", "file": str(tmp_path / "none.csv")})["ok"]
+    _write_s_pattern(file_name, 50)
+    assert control.handle({"cmd": "pattern", "file": str(file_name)})["ok"]
+    assert control.take_pending()[1].pattern_file_name == str(file_name)
+
+
+def test_control_server(tmp_path):
+    """tests requests are served on the Unix socket and the socket is removed on stop"""
+    socket_path = str(tmp_path / "control.sock")
+    control = ConsumerControl()
+    control.publish_status({"step": 3})
+    server = ControlServer(socket_path, control)
+    server.start()
+    try:
+        assert send_request(socket_path, {"cmd": "status"}) == {
+            "ok": True,
+            "status": {"step": 3},
+        }
+        assert send_request(socket_path, {"cmd": "pause"})["ok"]
+        assert control.paused
+    finally:
+        server.stop()
+    assert not (tmp_path / "control.sock").exists()
+
+
+def test_control_server_keeps_other_files(tmp_path):
+    """tests a file which is not a socket is not replaced by the control socket"""
+    file_name = tmp_path / "p.csv"
+    _write_s_pattern(file_name, 50)
+    with pytest.raises(ValueError):
+        ControlServer(str(file_name), ConsumerControl())
+    assert file_name.read_text(encoding="utf-8").startswith("s,mem")
+
+
+def test_run_process_with_forced_target(tmp_path):
+    """tests forced target overrides the pattern and the state is published"""
+    log_file = tmp_path / "run.jsonl"
+    control = ConsumerControl()
+    control.handle({"cmd": "force", "percent": 20})
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=100, time_slot_sec=1, duration_sec=1),
+        RunLogWriter("jsonl", str(log_file)),
+        control=control,
+    )
+    mem_consumer.run_process()
+    with open(log_file, mode="r", encoding="utf-8") as log:
+        records = [json.loads(line) for line in log]
+    assert [r["target_percent"] for r in records] == [20, 20]
+    assert records[0]["extra"]["control"] == {"paused": False, "forced_percent": 20}
+    status = control.handle({"cmd": "status"})["status"]
+    assert status["step"] == 1 and status["target_percent"] == 20
+
+
+def test_pattern_reload_and_params_change(tmp_path):
+    """tests the changed pattern file is reloaded and parameters are changed"""
+    # pylint: disable=protected-access
+    file_name = tmp_path / "p.csv"
+    _write_s_pattern(file_name, 50)
+    control = ConsumerControl(watch_pattern=True)
+    mem_consumer = MemConsumer(
+        MemPattern(str(file_name), noise_percent=3),
+        MemConsumerParams(max_ram_mega=1000),
+        control=control,
+    )
+    # partially written file is not loaded, the current pattern is kept
+    _write_s_pattern(file_name, 80, rows=20)
+    mem_consumer._apply_control(0)
+    assert mem_consumer.mem_pattern._data[(0,)] == 50
+    _write_s_pattern(file_name, 100)
+    mem_consumer._apply_control(0)
+    assert mem_consumer.mem_pattern.noise_percent == 3
+    assert mem_consumer.mem_pattern._data[(0,)] == 100
+
+    control.handle({"cmd": "set", "max_ram_mega": 2000, "noise_percent": 0})
+    mem_consumer._apply_control(0)
+    assert mem_consumer.mc_params.max_ram_mega == 2000
+    assert mem_consumer.mem_pattern.noise_percent == 0
+    # chunk size is kept, so twice more chunks are allocated
+    assert mem_consumer.chunk_size_mega == 10
+    assert mem_consumer.percent_to_chunks(30) == 60
@@ -0,0 +1,36 @@
+"""Tests for GcMonitor class"""
+import gc
+from memory_consumer.gc_monitor import GcMonitor
+
+
+def test_gc_monitor_collects_pauses_per_generation():
+    """tests forced collections are reported for the right generation and reset after read"""
+    gc_monitor = GcMonitor()
+    gc_monitor.install()
+    try:
+        garbage = [{} for _ in range(100)]
+        for i in range(100):
+            garbage[i]["self"] = garbage[i]
+        del garbage
+        gc.collect(2)
+        gc.collect(0)
+        stats = gc_monitor.step_stats()
+    finally:
+        gc_monitor.uninstall()
+    assert stats["gen2"]["collections"] >= 1
+    assert stats["gen2"]["collected"] >= 100
+    assert stats["gen2"]["max_pause_ms"] <= stats["gen2"]["pause_ms"]
+    assert stats["gen0"]["collections"] >= 1
+    assert stats["tracked_objects"] > 0
+    assert gc_monitor.step_stats()["gen2"]["collections"] == 0
+
+
+def test_gc_monitor_uninstall():
+    """tests no statistics are collected after uninstall"""
+    gc_monitor = GcMonitor(count_tracked=False)
+    gc_monitor.install()
+    gc_monitor.uninstall()
+    gc.collect()
+    stats = gc_monitor.step_stats()
+    assert stats["gen2"]["collections"] == 0
+    assert "tracked_objects" not in stats
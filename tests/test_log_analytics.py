@@ -0,0 +1,129 @@
+"""Tests for streaming log analytics"""
+import csv
+import gzip
+from datetime import datetime
+import pytest
+from memory_consumer.log_analytics import (
+    DownsampledCsvWriter,
+    StreamingHistogram,
+    analyze_log,
+    csv_file_names,
+    iter_log_records,
+    parse_text_line,
+)
+from memory_consumer.run_log import RunLogRecord, RunLogWriter
+
+START = datetime(2023, 10, 2, 11, 57, 0).timestamp()
+
+
+def __get_test_records():
+    """ten steps of 5s, target changes at steps 0 and 5, RSS reaches target one step later"""
+    records = []
+    for step in range(10):
+        target = 500 if step < 5 else 200
+        rss = {0: 100, 5: 480}.get(step, target + 5)
+        records.append(
+            RunLogRecord(
+                step=step,
+                mono_time=100.0 + 5 * step,
+                wall_time=START + 5 * step,
+                target_percent=target // 10,
+                target_mega=target,
+                max_ram_mega=1000,
+                achieved_mega=target,
+                process_mega=rss,
+                rss_mega=rss,
+                latency_sec=0.01,
+                time_slot_sec=5,
+                reset=step == 7,
+                extra={
+                    3: {"overrun_sec": 0.2, "telemetry": {"major_faults": 2, "swap_mega": 9.0}},
+                    4: {"telemetry": {"major_faults": 1, "swap_mega": 12.0}},
+                }.get(step, {}),
+            )
+        )
+    return records
+
+
+def test_parse_text_line():
+    """tests the human-readable allocation step line is parsed and other lines skipped"""
+    record = parse_text_line(
+        "2023-10-02 11:57:26, Allocated 90% of 1000 MB, (in memory array) 900 MB, "
+        "(in process) 910 MB for 5 sec"
+    )
+    assert record.target_mega == 900
+    assert record.rss_mega == 910
+    assert record.wall_time == datetime(2023, 10, 2, 11, 57, 26).timestamp()
+    assert parse_text_line("Start time: 2023-10-02 11:57:26") is None
+
+
+def test_streaming_histogram_percentile():
+    """tests percentile estimated from the histogram"""
+    histogram = StreamingHistogram(1)
+    for value in range(1, 101):
+        histogram.add(value - 0.5)
+    assert histogram.mean() == 50
+    assert histogram.percentile(99) == 99
+    assert histogram.percentile(100) == 99.5
+
+
+@pytest.mark.parametrize("log_format", ["jsonl", "binary"])
+def test_analyze_log(tmp_path, log_format):
+    """tests statistics computed for the structured logs"""
+    log_file = tmp_path / f"run.{log_format}"
+    writer = RunLogWriter(log_format, str(log_file), flush_every=4)
+    for record in __get_test_records():
+        writer.write(record)
+    writer.close()
+    summary = analyze_log(str(log_file), tolerance_percent=1.0)
+    assert summary["steps"] == 10
+    assert summary["duration_sec"] == 45
+    assert summary["max_error_mega"] == 400
+    assert summary["mae_mega"] == pytest.approx((400 + 280 + 8 * 5) / 10)
+    assert summary["adherence_percent"] == 80
+    assert summary["convergence_mean_sec"] == 5
+    assert summary["not_converged"] == 0
+    assert summary["resets"] == 1
+    assert summary["overruns"] == 1
+    assert summary["major_faults"] == 3
+    assert summary["max_swap_mega"] == 12
+
+
+def test_text_and_gzip_logs_are_read(tmp_path):
+    """tests the text log (with app info lines) is read from gzip compressed file"""
+    log_file = tmp_path / "run.log.gz"
+    writer = RunLogWriter("text", str(tmp_path / "run.log"))
+    for record in __get_test_records():
+        writer.write(record)
+    writer.close()
+    with gzip.open(log_file, mode="wb") as out:
+        out.write(b"Start time: 2023-10-02 11:57:00\n")
+        out.write((tmp_path / "run.log").read_bytes())
+    records = list(iter_log_records(str(log_file)))
+    assert [r.target_mega for r in records] == [r.target_mega for r in __get_test_records()]
+
+
+def test_downsampled_csv(tmp_path):
+    """tests values are averaged within time windows"""
+    csv_file = tmp_path / "run.csv"
+    writer = DownsampledCsvWriter(str(csv_file), window_sec=10)
+    for record in __get_test_records():
+        writer.add(record)
+    writer.close()
+    with open(csv_file, encoding="utf-8") as rows:
+        rows = list(csv.DictReader(rows))
+    assert len(rows) == 5
+    assert float(rows[0]["rss_mega"]) == (100 + 505) / 2
+    assert sum(int(row["resets"]) for row in rows) == 1
+
+
+def test_csv_file_names_are_unique():
+    """tests logs of the same name in different directories get different csv files"""
+    assert csv_file_names(["logs/run.jsonl"]) == ["run.jsonl.csv"]
+    assert csv_file_names(["logs/w1/run.jsonl", "logs/w2/run.jsonl"]) == [
+        "w1_run.jsonl.csv",
+        "w2_run.jsonl.csv",
+    ]
+    assert csv_file_names(["a.log", "b/a.log"]) == ["a.log.csv", "b_a.log.csv"]
+    with pytest.raises(ValueError):
+        csv_file_names(["a.log", "./a.log"])
@@ -0,0 +1,178 @@
+"""Tests for memory allocation backends"""
+import gc
+import os
+from multiprocessing import shared_memory
+import pytest
+from memory_consumer.mem_backends import (
+    MallocChurnBackend,
+    MallocChurnParams,
+    MemBackend,
+    ObjectGraphBackend,
+    ObjectGraphParams,
+    PageCacheBackend,
+    SharedMemoryBackend,
+    ShmBackend,
+)
+from memory_consumer.mem_consumer import MemConsumer, MemPattern, MemConsumerParams
+
+MEGA = 10**6
+
+
+def test_bytearray_backend_live_bytes():
+    """tests the default backend keeps track of bytes held in chunks"""
+    backend = MemBackend()
+    chunks = [backend.allocate(MEGA) for _ in range(3)]
+    assert backend.live_bytes() == 3 * MEGA
+    backend.release(chunks.pop())
+    assert backend.live_bytes() == 2 * MEGA
+
+
+@pytest.mark.parametrize("size_distribution", ["fixed", "uniform", "lognormal"])
+def test_malloc_backend_allocates_required_bytes(size_distribution):
+    """tests chunk made of native heap blocks has exactly the required size"""
+    backend = MallocChurnBackend(
+        MallocChurnParams(size_distribution=size_distribution, threads=2, seed=1)
+    )
+    chunk = backend.allocate(3 * MEGA + 7)
+    assert backend.live_bytes() == 3 * MEGA + 7
+    assert sum(sum(s.sizes) for s in chunk.slices) == 3 * MEGA + 7
+    assert all(len(s.ptrs) > 0 for s in chunk.slices)
+    backend.release(chunk)
+    assert backend.live_bytes() == 0
+    backend.close()
+
+
+def test_malloc_backend_churns_blocks():
+    """tests blocks with expired lifetime are renewed and statistics are reported"""
+    backend = MallocChurnBackend(
+        MallocChurnParams(lifetime_steps=1, threads=2, trim=True, seed=1)
+    )
+    backend.allocate(2 * MEGA)
+    churned = 0
+    for _ in range(3):
+        backend.after_change()
+        churned += backend.step_stats()["churned_blocks"]
+    assert churned > 0
+    stats = backend.step_stats()
+    assert stats["live_mega"] == pytest.approx(2.0, rel=0.2)
+    assert "fragmentation_mega" in stats
+    assert "fragmentation" in backend.memory_info()
+    backend.close()
+    assert backend.live_bytes() == 0
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"size_distribution": "pareto"},
+        {"threads": 0},
+        {"min_size": 16, "mean_size": 0, "max_size": 1024},
+        {"min_size": 2048, "mean_size": 2048, "max_size": 1024},
+        {"min_size": 0},
+        {"lifetime_steps": -1},
+    ],
+)
+def test_malloc_backend_wrong_params(params):
+    """tests wrong distribution, sizes and number of threads are rejected"""
+    with pytest.raises(ValueError):
+        MallocChurnBackend(MallocChurnParams(**params))
+
+
+def test_mem_consumer_with_malloc_backend():
+    """tests MemConsumer allocates and releases memory through the malloc backend"""
+    backend = MallocChurnBackend(MallocChurnParams(threads=2, trim=True, seed=1))
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(max_ram_mega=200),
+        backend=backend,
+    )
+    # the memory array is empty, so it reports the initial allocation only
+    initial_chunks = mem_consumer.mem_array_allocated_memory_mega() // 2
+    mem_consumer.change_allocation(initial_chunks + 30)
+    # the first chunk is reduced by the initial allocation rest (< 1 chunk)
+    assert 29 * 2 * MEGA < backend.live_bytes() <= 30 * 2 * MEGA
+    mem_consumer.change_allocation(0)
+    assert backend.live_bytes() == 0
+    backend.close()
+
+
+@pytest.mark.parametrize("object_kind", ["dict", "list", "cyclic"])
+def test_object_graph_backend(object_kind):
+    """tests object graphs are built for the required size and gc statistics are reported"""
+    backend = ObjectGraphBackend(ObjectGraphParams(object_kind=object_kind))
+    chunk = backend.allocate(2 * MEGA)
+    assert len(chunk) == 2 * MEGA // backend.unit_bytes
+    assert backend.live_bytes() == pytest.approx(2 * MEGA, abs=backend.unit_bytes)
+    backend.after_change()
+    stats = backend.step_stats()
+    assert set(stats["gc"]) >= {"gen0", "gen1", "gen2", "tracked_objects"}
+    backend.release(chunk)
+    assert backend.live_bytes() == 0
+    backend.close()
+
+
+def test_object_graph_backend_with_gc_freeze():
+    """tests allocated objects are frozen and released cycles are collected"""
+    backend = ObjectGraphBackend(ObjectGraphParams(object_kind="cyclic", gc_freeze=True))
+    chunk = backend.allocate(MEGA)
+    backend.after_change()
+    assert backend.step_stats()["gc"]["frozen_objects"] >= len(chunk)
+    backend.release(chunk)
+    del chunk
+    backend.after_change()
+    assert backend.step_stats()["gc"]["gen2"]["collected"] > 0
+    backend.close()
+    assert gc.get_freeze_count() == 0
+
+
+def test_page_cache_backend(tmp_path):
+    """tests unlinked files of the chunk size are created and closed on release"""
+    backend = PageCacheBackend(directory=str(tmp_path), keep_hot=True)
+    chunks = [backend.allocate(MEGA + 10) for _ in range(2)]
+    assert [os.fstat(chunk.fd).st_size for chunk in chunks] == [MEGA + 10] * 2
+    # nothing is left in the directory if the process is killed
+    assert not list(tmp_path.iterdir())
+    backend.after_change()
+    assert "page cache files = 2MB" in backend.memory_info()
+    assert backend.step_stats()["files_mega"] == 2.0
+    backend.release(chunks[0])
+    with pytest.raises(OSError):
+        os.fstat(chunks[0].fd)
+    backend.close()
+    assert backend.live_bytes() == 0
+
+
+@pytest.mark.parametrize("kind", ["memfd", "devshm"])
+def test_shm_backend(kind):
+    """tests shared memory segments are mapped, written and freed"""
+    backend = ShmBackend(kind)
+    chunk = backend.allocate(2 * MEGA)
+    assert chunk.mapping[0] == 1 and chunk.mapping[2 * MEGA - 1] == 1
+    assert f"{kind} segments = 2MB" in backend.memory_info()
+    assert backend.step_stats()["segments_mega"] == 2.0
+    assert "process_shared_mega" in backend.step_stats()
+    if kind == "devshm":
+        assert os.fstat(chunk.fd).st_nlink == 0
+    backend.close()
+    assert backend.live_bytes() == 0
+    assert chunk.mapping.closed
+
+
+def test_shared_memory_backend_blocks_are_shared():
+    """tests the second backend with the same prefix attaches to blocks of the first one"""
+    prefix = f"mc_test_{os.getpid()}"
+    creator = SharedMemoryBackend(prefix)
+    attacher = SharedMemoryBackend(prefix)
+    created = creator.allocate(MEGA)
+    attached = attacher.allocate(MEGA)
+    assert attached.name == created.name
+    assert attached.buf[MEGA - 1] == 1
+    assert "1 created, 0 attached" in creator.memory_info()
+    assert "0 created, 1 attached" in attacher.memory_info()
+    assert attacher.step_stats()["attached_blocks"] == 1
+    attacher.close()
+    # the block is still available to its creator
+    assert created.buf[0] == 1
+    creator.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created.name)
@@ -1,9 +1,12 @@
 """Tests for MemConsumer class"""
 import gc
+import json
 import random
-from time import sleep
+from datetime import datetime
+from time import monotonic, sleep
 import pytest
 from memory_consumer.mem_consumer import MemConsumer, MemPattern, MemConsumerParams
+from memory_consumer.run_log import RunLogWriter
 
 gc.set_threshold(100, 10, 10)
 
@@ -127,3 +130,93 @@ def test_get_trend_multiplier_from_dhm_profile(step):
         7 * 24 * 60 * 60 / mem_consumer.mc_params.time_slot_sec
     )
     assert trend_multiplier == trend_multiplier_should_be
+
+
+def test_pattern_time_with_speed_up():
+    """tests pattern time runs speed_up times faster than wall time"""
+    start = datetime.now()
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/dhm.csv"), MemConsumerParams(speed_up=3600.0)
+    )
+    sleep(0.1)
+    pattern_time = mem_consumer.pattern_time()
+    elapsed = (datetime.now() - start).total_seconds()
+    assert 0.1 * 3600 <= (pattern_time - start).total_seconds() <= elapsed * 3600
+    assert mem_consumer.wall_time_slot_sec() == pytest.approx(5 / 3600)
+
+
+def test_run_process_with_speed_up(tmp_path, capsys):
+    """tests timeslot is compressed and steps not fitting the timeslot are reported"""
+    log_file = tmp_path / "run.jsonl"
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(
+            max_ram_mega=100, time_slot_sec=1, duration_sec=3, speed_up=10.0**6
+        ),
+        RunLogWriter("jsonl", str(log_file)),
+    )
+    mem_consumer.run_process()
+    with open(log_file, mode="r", encoding="utf-8") as log:
+        records = [json.loads(line) for line in log]
+    assert len(records) == 4
+    assert all(r["extra"]["speed_up"] == 10.0**6 for r in records)
+    # a step (memory probe at least) does not fit 1us timeslot
+    assert all(r["extra"]["overrun_sec"] > 0 for r in records)
+    assert "allocation cannot keep up with the timeslot" in capsys.readouterr().out
+
+
+def test_change_allocation_telemetry():
+    """tests resource usage of the allocation change is returned and logged"""
+    mem_consumer = __get_test_mem_consumer("tests/patterns/s.csv", 0, 1, 0.0)
+    initial_chunks = mem_consumer.mem_array_allocated_memory_mega()
+    telemetry = mem_consumer.change_allocation(initial_chunks + 50)
+    assert telemetry is mem_consumer.last_telemetry
+    assert telemetry.minor_faults > 0
+    assert telemetry.wall_sec > 0
+    # pylint: disable=protected-access
+    record = mem_consumer._step_record(0, initial_chunks + 50, telemetry)
+    assert record.extra["telemetry"]["minor_faults"] == telemetry.minor_faults
+    assert record.latency_sec == telemetry.wall_sec
+    mem_consumer.change_allocation(0)
+
+
+def test_change_allocation_with_linear_ramp():
+    """tests chunks are allocated gradually and the release rate limit defers the change"""
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(
+            max_ram_mega=100,
+            time_slot_sec=1,
+            ramp_shape="linear",
+            release_rate_mega_sec=10,
+        ),
+    )
+    initial_chunks = mem_consumer.mem_array_allocated_memory_mega()
+    telemetry = mem_consumer.change_allocation(initial_chunks + 20)
+    # the change is spread over 90% of the timeslot without the settle time
+    assert telemetry.wall_sec == pytest.approx(0.63, abs=0.1)
+    assert mem_consumer.mem_array_allocated_memory_mega() == initial_chunks + 20
+    # 1MB chunks released at 10MB/s within 0.63s, the first one after 0.1s
+    mem_consumer.change_allocation(0)
+    assert mem_consumer.mem_array_allocated_memory_mega() == initial_chunks + 14
+    mem_consumer.change_allocation(0)
+
+
+def test_alloc_rate_limit_holds_across_steps():
+    """tests the average allocation rate of many steps does not exceed the limit,
+    also when a chunk interval is longer than the ramp window"""
+    mem_consumer = MemConsumer(
+        MemPattern("tests/patterns/s.csv"),
+        MemConsumerParams(
+            max_ram_mega=1000, time_slot_sec=1, speed_up=4, alloc_rate_mega_sec=20
+        ),
+    )
+    initial_mega = mem_consumer.mem_array_allocated_memory_mega()
+    start = monotonic()
+    for _ in range(10):
+        mem_consumer.change_allocation(90)
+    elapsed = monotonic() - start
+    allocated_mega = mem_consumer.mem_array_allocated_memory_mega() - initial_mega
+    # 10MB chunks at 20MB/s, a chunk every 0.5s, while a step lasts 0.25s
+    assert 10 <= allocated_mega <= 20 * elapsed
+    mem_consumer.change_allocation(0)
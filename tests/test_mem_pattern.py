@@ -230,3 +230,9 @@ def test_get_first_value_for_any_datetime(profile_file, first_value):
     d_t_now = datetime.now()
     time_shift = mem_p.get_time_shift_from_start(d_t_now)
     assert mem_p.get_value(date_time=d_t_now - time_shift) == first_value
+
+
+def test_is_complete():
+    """tests all patterns used in tests cover their whole period"""
+    for pattern_file_name in ("s.csv", "m.csv", "ms.csv", "dhm.csv"):
+        assert MemPattern(f"tests/patterns/{pattern_file_name}").is_complete()
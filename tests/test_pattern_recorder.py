@@ -0,0 +1,93 @@
+"""Tests for recording memory usage as a memory consumption pattern"""
+import os
+from datetime import datetime, timedelta
+import pytest
+from memory_consumer.mem_pattern import MemPattern
+from memory_consumer.pattern_recorder import (
+    PatternBuilder,
+    RssSampler,
+    pattern_key,
+    record_samples,
+)
+
+MEGA = 10**6
+
+
+def test_process_sampler():
+    """tests RSS of the process is read and recorded with the required interval"""
+    sampler = RssSampler(pid=os.getpid())
+    chunk = bytearray(50 * MEGA)
+    samples = list(record_samples(sampler, 0.05, 0.2))
+    sampler.close()
+    assert len(samples) == 5
+    assert all(value > len(chunk) for _, value in samples)
+    assert samples[-1][0] - samples[0][0] >= timedelta(seconds=0.15)
+
+
+def test_cgroup_sampler(tmp_path):
+    """tests memory usage of the cgroup is read from the v2 file"""
+    (tmp_path / "memory.current").write_text("123456789\n")
+    sampler = RssSampler(cgroup=str(tmp_path))
+    assert sampler.read_bytes() == 123456789
+    sampler.close()
+    with pytest.raises(ValueError):
+        RssSampler(cgroup=str(tmp_path / "missing"))
+    with pytest.raises(ValueError):
+        RssSampler()
+
+
+def test_pattern_key():
+    """tests samples are assigned to the time slots of the pattern period"""
+    d_t = datetime(2023, 10, 4, 13, 47, 29)
+    assert pattern_key(d_t, "s", 10) == (20,)
+    assert pattern_key(d_t, "ms", 15) == (47, 15)
+    assert pattern_key(d_t, "hm", 5) == (13, 45)
+    assert pattern_key(d_t, "dhm", 30) == (2, 13, 30)
+
+
+def test_pattern_builder_folds_and_fills(tmp_path):
+    """tests samples are folded into the period, missing slots are filled and
+    the written pattern is complete"""
+    builder = PatternBuilder("s", resolution=10, max_mega=1000, aggregate="mean")
+    start = datetime(2023, 10, 4, 13, 0, 10)
+    # two periods, the values of the same slots are averaged
+    for period, value in enumerate((400, 600)):
+        builder.add(start + timedelta(minutes=period), value * MEGA)
+        builder.add(start + timedelta(minutes=period, seconds=30), 2 * value * MEGA)
+    values = builder.values()
+    assert values == {(0,): 100, (10,): 50, (20,): 50, (30,): 50, (40,): 100, (50,): 100}
+    file_name = tmp_path / "recorded.csv"
+    builder.write(str(file_name))
+    mem_pattern = MemPattern(str(file_name))
+    assert mem_pattern.is_complete()
+    assert mem_pattern.get_value(datetime(2023, 10, 5, 8, 0, 25)) == 50
+
+
+@pytest.mark.parametrize("aggregate, expected", [("mean", 50), ("max", 80), ("last", 70)])
+def test_pattern_builder_aggregates(aggregate, expected):
+    """tests samples of a slot are combined by running aggregates, not kept"""
+    # pylint: disable=protected-access
+    builder = PatternBuilder("m", max_mega=1000, aggregate=aggregate)
+    start = datetime(2023, 10, 4, 13, 0, 0)
+    for second, value in enumerate((300, 800, 600, 100, 700)):
+        builder.add(start + timedelta(seconds=second), value * MEGA)
+    assert builder.values()[(0,)] == expected
+    assert builder.samples == 5 and len(builder._slots[(0,)]) == 4
+
+
+def test_pattern_builder_normalises_to_maximum():
+    """tests values are percents of the maximal slot value if maximum is not given"""
+    builder = PatternBuilder("m", aggregate="max")
+    builder.add(datetime(2023, 10, 4, 13, 0, 0), 100 * MEGA)
+    builder.add(datetime(2023, 10, 4, 13, 0, 30), 300 * MEGA)
+    builder.add(datetime(2023, 10, 4, 13, 1, 0), 150 * MEGA)
+    values = builder.values()
+    assert values[(0,)] == 100 and values[(1,)] == 50 and values[(59,)] == 50
+    with pytest.raises(ValueError):
+        PatternBuilder("s", resolution=7)
+    # MemPattern cannot detect the resolution of 60 from the written file
+    for pattern_type in ("s", "m", "ms", "hm", "dhm"):
+        with pytest.raises(ValueError):
+            PatternBuilder(pattern_type, resolution=60)
+    with pytest.raises(ValueError):
+        PatternBuilder("ms").values()
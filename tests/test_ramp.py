@@ -0,0 +1,49 @@
+"""Tests for schedules of paced allocation changes"""
+import pytest
+from memory_consumer.ramp import ramp_times
+
+
+def test_step_ramp():
+    """tests the whole change is done at once"""
+    assert ramp_times(5, 10, 2.0) == [0.0] * 5
+
+
+def test_linear_ramp():
+    """tests chunks are spread evenly over the window"""
+    assert ramp_times(4, 10, 2.0, "linear") == pytest.approx([0.5, 1.0, 1.5, 2.0])
+
+
+def test_exponential_ramp():
+    """tests the change is fast at the start and slows down towards the end of the window"""
+    times = ramp_times(10, 10, 1.0, "exponential")
+    assert len(times) == 10
+    assert times[-1] == pytest.approx(1.0)
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert gaps == sorted(gaps)
+
+
+def test_rate_limited_ramp():
+    """tests the rate limit delays chunks and the change exceeding the window is cut"""
+    # 10MB chunks at 20MB/s, a chunk every 0.5s
+    assert ramp_times(10, 10, 2.0, "step", rate_mega_sec=20) == [0.5, 1.0, 1.5, 2.0]
+    assert ramp_times(2, 10, 2.0, "linear", rate_mega_sec=20) == [1.0, 2.0]
+
+
+def test_rate_limit_counted_from_last_chunk():
+    """tests the rate limit is counted from the last chunk of the previous ramp"""
+    # 10MB chunks at 1MB/s, a chunk every 10s, ramps of 4.23s every 5s
+    assert not ramp_times(30, 10, 4.23, "step", rate_mega_sec=1.0)
+    assert not ramp_times(30, 10, 4.23, "step", rate_mega_sec=1.0, rate_start_sec=-5.0)
+    assert ramp_times(30, 10, 4.23, "step", rate_mega_sec=1.0, rate_start_sec=-10.0) == [0.0]
+    # an idle time before the ramp does not allow a burst
+    assert ramp_times(3, 10, 25.0, "step", rate_mega_sec=1.0, rate_start_sec=-100.0) == [
+        0.0,
+        10.0,
+        20.0,
+    ]
+
+
+def test_unknown_ramp_shape():
+    """tests unknown shape is rejected"""
+    with pytest.raises(ValueError):
+        ramp_times(1, 10, 1.0, "sigmoid")
@@ -0,0 +1,90 @@
+"""Tests for RunLogWriter and run log renderers"""
+import json
+from datetime import datetime
+import pytest
+from memory_consumer.run_log import (
+    RunLogRecord,
+    RunLogWriter,
+    read_binary_records,
+    render_text,
+)
+
+
+def __get_test_record(step=0, extra=None) -> RunLogRecord:
+    return RunLogRecord(
+        step=step,
+        mono_time=1234.5,
+        wall_time=datetime(2023, 10, 2, 11, 57, 26).timestamp(),
+        target_percent=90,
+        target_mega=900,
+        max_ram_mega=1000,
+        achieved_mega=900,
+        process_mega=910,
+        rss_mega=905,
+        latency_sec=0.01,
+        time_slot_sec=5,
+        extra=extra or {},
+    )
+
+
+def test_render_text_keeps_human_readable_format():
+    """tests the text renderer produces the classic allocation step log line"""
+    assert render_text(__get_test_record()) == (
+        "2023-10-02 11:57:26, Allocated 90% of 1000 MB, (in memory array) 900 MB, "
+        "(in process) 910 MB for 5 sec\n"
+    )
+
+
+def test_jsonl_log_is_buffered_until_flush_every(tmp_path):
+    """tests records are written out in batches of flush_every records"""
+    log_file = tmp_path / "run.jsonl"
+    writer = RunLogWriter("jsonl", str(log_file), flush_every=3)
+    writer.write(__get_test_record(0))
+    writer.write(__get_test_record(1))
+    assert not log_file.exists() or log_file.read_text() == ""
+    writer.write(__get_test_record(2))
+    lines = log_file.read_text().splitlines()
+    assert [json.loads(line)["step"] for line in lines] == [0, 1, 2]
+    writer.write(__get_test_record(3))
+    writer.close()
+    assert len(log_file.read_text().splitlines()) == 4
+
+
+def test_binary_log_round_trip(tmp_path):
+    """tests records written in the binary format are read back unchanged"""
+    log_file = tmp_path / "run.bin"
+    records = [__get_test_record(i, extra={"k": i} if i % 2 else None) for i in range(5)]
+    writer = RunLogWriter("binary", str(log_file), flush_every=2)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    with open(log_file, mode="rb") as stream:
+        assert list(read_binary_records(stream)) == records
+
+
+def test_log_file_is_rotated_at_max_bytes(tmp_path):
+    """tests the log file is rotated when its size exceeds max_bytes"""
+    log_file = tmp_path / "run.log"
+    line_size = len(render_text(__get_test_record()))
+    writer = RunLogWriter(
+        "text", str(log_file), max_bytes=3 * line_size, backup_count=2
+    )
+    for i in range(10):
+        writer.write(__get_test_record(i))
+    writer.close()
+    assert len(log_file.read_text().splitlines()) == 1
+    assert len((tmp_path / "run.log.1").read_text().splitlines()) == 3
+    assert len((tmp_path / "run.log.2").read_text().splitlines()) == 3
+    assert not (tmp_path / "run.log.3").exists()
+
+
+def test_unknown_log_format():
+    """tests unknown log format is rejected"""
+    with pytest.raises(ValueError):
+        RunLogWriter("xml")
+
+
+def test_binary_log_to_stdout_is_rejected():
+    """tests binary log without a file is rejected, it would be mixed with other output"""
+    with pytest.raises(ValueError):
+        RunLogWriter("binary")
@@ -0,0 +1,34 @@
+"""Tests for measurements of the process resource usage"""
+import math
+from memory_consumer.telemetry import StepTelemetry, TelemetryProbe, read_swap_mega
+
+MEGA = 10**6
+
+
+def test_probe_counts_page_faults():
+    """tests touching new memory is seen as minor page faults and CPU time"""
+    probe = TelemetryProbe()
+    probe.start()
+    chunk = bytearray(50 * MEGA)
+    telemetry = probe.stop()
+    del chunk
+    # at least a fault per 2MB (huge page), 4kB pages give much more
+    assert telemetry.minor_faults >= 50 * MEGA // (2 * 2**20)
+    assert telemetry.wall_sec > 0
+    assert telemetry.cpu_user_sec + telemetry.cpu_system_sec >= 0
+    assert telemetry.swap_mega >= 0
+
+
+def test_read_swap_mega(tmp_path):
+    """tests VmSwap is read from the status file"""
+    status_file = tmp_path / "status"
+    status_file.write_text("Name:\tpython\nVmRSS:\t  2048 kB\nVmSwap:\t  1000 kB\n")
+    assert read_swap_mega(str(status_file)) == 1.024
+    assert math.isnan(read_swap_mega(str(tmp_path / "missing")))
+
+
+def test_telemetry_as_dict():
+    """tests the telemetry is converted to the dictionary logged in the run log"""
+    telemetry = StepTelemetry(wall_sec=0.1234567891, minor_faults=7)
+    assert telemetry.as_dict()["wall_sec"] == 0.123457
+    assert telemetry.as_dict()["minor_faults"] == 7